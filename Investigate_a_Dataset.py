@@ -184,7 +184,7 @@ df.head(2)
 
 
 # Create the new column Appointment_weekday
-df['Appointment_Weekday'] = (df.Appointment_Day).dt.weekday_name
+df['Appointment_Weekday'] = (df.Appointment_Day).dt.day_name()
 
 #Check shows up and no shows up per weekday
 df.groupby('Appointment_Weekday')['No_Show'].value_counts()
@@ -517,11 +517,12 @@ from scipy.stats import chi2_contingency
 
 
 #Conduct the Chi-Square Test(chi2), showing the p (p-value), dof(degrees of freedom) and ex(expected frequencies)
-chi2, p, dof,ex = chi2_contingency(gender_vs_no_show, correction=False)
+# (the test needs the counts, not the proportions shown in the plot)
+chi2, p, dof,ex = chi2_contingency(pd.crosstab(index = df['Gender'], columns = df['No_Show']), correction=False)
 chi2, p
 
 
-# The p-value is greater than 0.05% (0.99%), therefore, I am going not going to assume that **there is NOT a meaningful relationship between the gender and the appointment status.**
+# The p-value is greater than 0.05 (0.17), therefore, I fail to reject the null hypothesis and assume that **there is NOT a meaningful relationship between the gender and the appointment status.**
 
 # ### Questions 4 & 5:  
 # >### Is there a relationship between being involved in a scholarship and the status of the appointment?
@@ -680,11 +681,12 @@ L.get_texts()[1].set_text('No Showed up')
 
 
 #Conduct the Chi-Square Test(chi2), showing the p (p-value), dof(degrees of freedom) and ex(expected frequencies)
-chi2, p, dof,ex = chi2_contingency(weekdays_vs_no_show, correction=False)
+# (the test needs the counts of weekdays_vs_NoShow, not the proportions)
+chi2, p, dof,ex = chi2_contingency(weekdays_vs_NoShow, correction=False)
 chi2, p
 
 
-# The p-value is greater than 0.05% (0.99%), therefore, I am going not going to assume that **there is NOT a meaningful relationship between the appointment weekday and the appointment status.**
+# The p-value is smaller than 0.05 (4.4e-05), therefore, I reject the null hypothesis and assume that **there is a meaningful relationship between the appointment weekday and the appointment status**, although the difference is small and Saturday has very few records.
 
 # ### Question 8:  
 # >### Does the waiting days period of time affect the status of the appointment?
@@ -741,7 +743,7 @@ L.get_texts()[1].set_text('No Showed up');
 # 5. The **Top 10 neighborhoods** with the highest number of **no-show ups** are, in order: Jardim Camburi, Maria Ortiz, Itararé, Resistência, Centro, Jesus De Nazareth, Jardim Da Penha, Caratoíra, Tabuazeiro Y Bonfim.
 # 
 # 
-# 6. **Wednesdays and Tuesdays** are the days with the **highest number of appointments**, while **Thursday and Saturday** are the days with the **least number of appointments**, although there is no significant relationship between the date of the appointment and its final status.
+# 6. **Wednesdays and Tuesdays** are the days with the **highest number of appointments**, while **Thursday and Saturday** are the days with the **least number of appointments**, and the Chi-Square Test shows a significant, although small, relationship between the weekday of the appointment and its final status.
 # 
 # 
 # 7. **The shorten awaiting period the more patients show up.**
@@ -753,6 +755,7 @@ L.get_texts()[1].set_text('No Showed up');
 # >-	Hipertension
 # >-	Diabetes
 # >-	SMS_received
+# >-	Appointment_Weekday
 # 
 # 
 # 
@@ -0,0 +1,116 @@
+"""Benchmark the noshow pipeline on synthetic exports of increasing size.
+
+For every size a synthetic CSV with the Kaggle schema is written once (and
+reused by later runs), then each stage of the pipeline is timed: loading,
+derived columns, cleaning, every question's computation, the statistical
+tests and figure rendering. Wall time, CPU time, rows in/out and the peak
+RSS of each stage are written as JSON, e.g.::
+
+    python benchmarks/run_benchmarks.py --rows 100000 1000000 --output bench.json
+
+Peak RSS is measured per stage on Linux (by resetting the high-water mark
+through /proc/self/clear_refs); elsewhere it is the process peak so far.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from noshow.cleaning import add_derived_columns, apply_rules  # noqa: E402
+from noshow.contingency import contingency_tables  # noqa: E402
+from noshow.instrument import peak_rss_mb, reset_peak_rss  # noqa: E402
+from noshow.loader import load_appointments  # noqa: E402
+from noshow.questions import QUESTIONS  # noqa: E402
+from noshow.stats import ttest_by_class  # noqa: E402
+from noshow.synthetic import write_synthetic  # noqa: E402
+
+SIZES = [100000, 1000000, 10000000, 100000000]
+
+
+def timed(records, rows, stage, func, rows_in=None):
+    """Run ``func()``, append its measurements to ``records``, return its value."""
+    reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    value = func()
+    record = {'rows': rows, 'stage': stage,
+              'wall_s': time.perf_counter() - wall,
+              'cpu_s': time.process_time() - cpu,
+              'peak_rss_mb': peak_rss_mb(),
+              'rows_in': rows_in,
+              'rows_out': len(value) if isinstance(value, pd.DataFrame) else None}
+    records.append(record)
+    print('{rows:>11,} {stage:<22} {wall_s:8.3f}s  {peak_rss_mb:9.1f} MB'
+          .format(**record), file=sys.stderr)
+    return value
+
+
+def bench_size(rows, workdir, chunksize, render, seed):
+    path = os.path.join(workdir, 'synthetic-{}-{}.csv'.format(rows, seed))
+    if not os.path.exists(path):
+        write_synthetic(path, rows, chunksize, seed)
+    records = []
+    df = timed(records, rows, 'load', lambda: load_appointments(
+        path, chunksize if rows > chunksize else None))
+    n = len(df)
+    df = timed(records, rows, 'derive', lambda: add_derived_columns(df), n)
+    df = timed(records, rows, 'clean', lambda: apply_rules(df)[0], n)
+    n = len(df)
+    results = {}
+    for number, question in sorted(QUESTIONS.items()):
+        results[number] = timed(records, rows, 'q{}'.format(number),
+                                lambda: question.compute(df), n)
+    timed(records, rows, 'chi2_tests', lambda: contingency_tables(df), n)
+    timed(records, rows, 'ttest', lambda: ttest_by_class(df, 'Age'), n)
+    if render:
+        from noshow.report import render_report
+        with tempfile.TemporaryDirectory() as out:
+            timed(records, rows, 'render',
+                  lambda: render_report(results, out), n)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES[:2],
+                        help='sizes to benchmark (default: %(default)s)')
+    parser.add_argument('--workdir', default=os.path.join(
+        tempfile.gettempdir(), 'noshow-bench'),
+        help='where the synthetic CSVs are kept (default: %(default)s)')
+    parser.add_argument('--chunksize', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-render', dest='render', action='store_false')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    records = []
+    for rows in args.rows:
+        records.extend(bench_size(rows, args.workdir, args.chunksize,
+                                  args.render, args.seed))
+    report = {'meta': {'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'pandas': pd.__version__,
+                       'platform': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')},
+              'results': records}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
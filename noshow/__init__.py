@@ -0,0 +1,39 @@
+"""Reusable pipeline for the No-show medical appointments investigation.
+
+The notebook (Investigate_a_Dataset.ipynb / .py) tells the story of the
+analysis; this package holds the same wrangling and analysis steps written so
+they can run on the full monthly exports.
+"""
+
+from .loader import (COLUMNS, DATA_FILE, DATE_COLUMNS, FLAG_COLUMNS,
+                     concat_chunks, iter_appointments, load_appointments)
+from .features import (LEAD_TIMES, WEEKDAYS, add_date_features,
+                       parse_timestamps)
+from .cleaning import (CLEANING_VERSION, RULES, Rule, add_derived_columns,
+                       apply_rules, clean_appointments)
+from .cache import build_if_missing, load_clean
+from .profile import profile_frame, profile_parquet
+from .stats import (Moments, adjust_pvalues, as_counts, chi2_batch,
+                    chi2_results, chi2_test, class_moments, group_moments,
+                    stack_tables, ttest_by_class, ttest_moments)
+from .contingency import (CATEGORICAL, chi2_summary, contingency_tables,
+                          stratified_chi2, stratified_counts)
+from .incremental import ShowRateAggregator
+from .questions import QUESTIONS, Question
+from .runner import run_questions
+from .binning import BIN_METHODS, bin_edges, binned_contingency, rebin
+from .neighbourhoods import NeighbourhoodIndex
+from .patients import HISTORY_COLUMNS, PatientIndex
+from .synthetic import iter_synthetic, write_synthetic
+from . import instrument
+from .outofcore import aggregate_csv, question_results, run_out_of_core
+from .plan import QUESTION_QUERIES, Planner, Query, plan_questions
+from .memo import ResultCache, fingerprint, question_batch, question_result
+from .scoring import RiskModel, roc_auc, with_history
+from .resampling import (bootstrap_mean_difference, bootstrap_rates,
+                         permutation_chi2, permutation_mean_difference,
+                         resample, resample_questions)
+from .sketches import (CountMinSketch, HyperLogLog, SketchAggregator,
+                       TDigest, TopK)
+from .integrity import (CHECKS, HashStore, check_csv, check_integrity,
+                        row_hashes)
@@ -0,0 +1,121 @@
+"""Binned show/no-show counts of a numeric variable (e.g. Waiting_Days).
+
+One bar or crosstab row per distinct waiting day grows with the length of
+the history. Binning keeps the table -- and the plot drawn from it -- at a
+fixed size: the edges are chosen once (fixed width, quantiles or powers of
+two) and the counts per (bin, No_Show) come from a single bincount.
+
+Bins are left-closed integer intervals ``[edges[i], edges[i + 1])``; values
+below the first edge fall in the first bin and values from the last inner
+edge upwards in the last one.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .contingency import Contingency, encode
+from .stats import chi2_test
+
+BIN_METHODS = ('fixed', 'quantile', 'log')
+
+
+def bin_edges(values, method='log', n_bins=10, weights=None):
+    """Integer bin edges for ``values``.
+
+    'fixed' splits the range into ``n_bins`` bins of equal width,
+    'quantile' into at most ``n_bins`` bins of about equal counts, and 'log'
+    uses 0, 1, 2, 4, 8, ... (``n_bins`` is ignored). With ``weights``,
+    ``values`` are distinct values and ``weights`` how often each occurs
+    (e.g. an already aggregated histogram); the edges are the same as for
+    the expanded values. Without any values there is one (empty) bin,
+    ``[0, 1)``.
+    """
+    if method not in BIN_METHODS:
+        raise ValueError('method must be one of {}'.format(BIN_METHODS))
+    values = np.asarray(values)
+    if weights is not None:
+        weights = np.asarray(weights)
+        values = values[weights > 0]
+        weights = weights[weights > 0]
+    if not len(values):
+        return np.array([0, 1], dtype=np.int64)
+    low, high = int(values.min()), int(values.max()) + 1
+    if method == 'fixed':
+        width = max(1, -(-(high - low) // n_bins))
+        edges = np.arange(low, high + width, width)
+    elif method == 'quantile':
+        probabilities = np.linspace(0, 1, n_bins + 1)
+        if weights is None:
+            quantiles = np.quantile(values, probabilities,
+                                    method='inverted_cdf')
+        else:
+            order = np.argsort(values)
+            cumulative = np.cumsum(weights[order])
+            # Same definition as method='inverted_cdf' on the expanded values
+            ranks = np.ceil(probabilities * cumulative[-1]).clip(1, None)
+            quantiles = values[order][np.searchsorted(cumulative, ranks)]
+        edges = np.unique(np.append(np.floor(quantiles[:-1]), high))
+    else:
+        edges = [low]
+        step = 1
+        while edges[-1] < high:
+            edges.append(max(edges[-1] + 1, step))
+            step *= 2
+        edges = np.array(edges)
+    return edges.astype(np.int64)
+
+
+def bin_labels(edges):
+    """'0', '2-3', ..., 'n+' labels of the bins between ``edges``."""
+    labels = []
+    for low, high in zip(edges[:-2], edges[1:-1]):
+        labels.append(str(low) if high - low == 1
+                      else '{}-{}'.format(low, high - 1))
+    labels.append('{}+'.format(edges[-2]))
+    return pd.Index(labels)
+
+
+def bin_codes(values, edges):
+    """Bin index of every value."""
+    codes = np.searchsorted(edges, values, side='right') - 1
+    return np.clip(codes, 0, len(edges) - 2)
+
+
+def binned_contingency(df, column='Waiting_Days', edges=None, method='log',
+                       n_bins=10, target='No_Show'):
+    """Counts (and chi-square test) of binned ``column`` vs target.
+
+    ``edges`` overrides ``method``/``n_bins``. The row proportions of the
+    result are the show and no-show rates per bin.
+    """
+    values = df[column].to_numpy()
+    if edges is None:
+        edges = bin_edges(values, method, n_bins)
+    target_codes, classes = encode(df[target])
+    n_classes = len(classes)
+    valid = target_codes >= 0
+    flat = bin_codes(values[valid], edges) * n_classes + target_codes[valid]
+    counts = np.bincount(flat, minlength=(len(edges) - 1) * n_classes)
+    counts = pd.DataFrame(counts.reshape(-1, n_classes),
+                          index=bin_labels(edges).rename(column),
+                          columns=pd.Index(classes, name=target))
+    return _contingency(counts)
+
+
+def rebin(counts, edges):
+    """Collapse a count table indexed by integer values into bins.
+
+    Useful for tables that are already aggregated, such as the Waiting_Days
+    counts of a ShowRateAggregator.
+    """
+    codes = bin_codes(counts.index.to_numpy(), edges)
+    binned = counts.groupby(codes).sum()
+    binned = binned.reindex(range(len(edges) - 1), fill_value=0)
+    binned.index = bin_labels(edges).rename(counts.index.name)
+    return _contingency(binned)
+
+
+def _contingency(counts):
+    # Empty bins carry no information for the test
+    test = chi2_test(counts[counts.sum(axis=1) > 0].to_numpy())
+    return Contingency(counts, test.chi2, test.p, test.dof)
@@ -0,0 +1,167 @@
+"""On-disk columnar cache of the cleaned appointments frame.
+
+The cache key is a hash of the source CSV plus CLEANING_VERSION, so a cached
+frame is reused only while both the data and the cleaning rules are
+unchanged. Frames are stored as uncompressed Feather (Arrow IPC) files, which
+are memory-mapped when read back; Parquet is available for smaller files.
+Both formats need pyarrow.
+
+Every new export (and every CLEANING_VERSION bump) gives a new key, so
+after each build the frames of older cleaning versions are removed and only
+the MAX_FRAMES most recently used frames are kept.
+"""
+
+import hashlib
+import os
+
+from .cleaning import CLEANING_VERSION, clean_appointments
+from .instrument import stage
+from .loader import DATA_FILE, load_appointments
+
+CACHE_DIR = '.noshow_cache'
+FORMATS = ('feather', 'parquet')
+# Cleaned frames kept in the cache directory (the current export and the
+# one before it, by default)
+MAX_FRAMES = 2
+_PREFIX = 'appointments-'
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError('the cleaned-frame cache needs pyarrow '
+                          '(pip install pyarrow)') from None
+
+
+def file_digest(path, block_size=1 << 20):
+    """Hex digest of a file's contents, read in blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(path, cache_dir=CACHE_DIR, fmt='feather'):
+    """Location of the cached cleaned frame for the CSV at ``path``."""
+    if fmt not in FORMATS:
+        raise ValueError('fmt must be one of {}'.format(FORMATS))
+    name = '{}{}-v{}.{}'.format(_PREFIX, file_digest(path), CLEANING_VERSION,
+                                fmt)
+    return os.path.join(cache_dir, name)
+
+
+def write_frame(df, target, fmt='feather'):
+    """Write ``df`` atomically to ``target``."""
+    _pyarrow()
+    tmp = target + '.tmp'
+    if fmt == 'feather':
+        df.to_feather(tmp, compression='uncompressed')
+    else:
+        df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def read_frame(target, fmt='feather'):
+    """Read a cached frame back, memory-mapping Feather files."""
+    _pyarrow()
+    if fmt == 'feather':
+        from pyarrow import feather
+        return feather.read_table(target, memory_map=True).to_pandas()
+    import pandas as pd
+    return pd.read_parquet(target)
+
+
+def cached_frames(cache_dir=CACHE_DIR):
+    """``(mtime, path)`` of every cached frame, least recently used first."""
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for entry in os.scandir(cache_dir):
+        ext = os.path.splitext(entry.name)[1][1:]
+        if not entry.name.startswith(_PREFIX) or ext not in FORMATS:
+            continue
+        try:
+            entries.append((entry.stat().st_mtime_ns, entry.path))
+        except FileNotFoundError:
+            continue
+    return sorted(entries)
+
+
+def evict(cache_dir=CACHE_DIR, max_frames=MAX_FRAMES):
+    """Remove stale cached frames.
+
+    Frames of another CLEANING_VERSION are removed, and of the others only
+    the ``max_frames`` most recently used are kept.
+    """
+    entries = cached_frames(cache_dir)
+    current = '-v{}.'.format(CLEANING_VERSION)
+    stale = [path for _, path in entries
+             if current not in os.path.basename(path)]
+    fresh = [path for _, path in entries if path not in stale]
+    for path in stale + fresh[:max(0, len(fresh) - max_frames)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _touch(target):
+    # Reading counts as a use for the eviction order
+    try:
+        os.utime(target)
+    except OSError:
+        pass
+
+
+def _build(path, target, fmt, chunksize):
+    df = clean_appointments(load_appointments(path, chunksize))
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    with stage('cache.write', len(df)):
+        write_frame(df, target, fmt)
+    evict(os.path.dirname(target) or '.')
+    return df
+
+
+def build_if_missing(path=DATA_FILE, cache_dir=CACHE_DIR, fmt='feather',
+                     chunksize=None):
+    """Path of the cached cleaned frame and, if it was just built, the frame.
+
+    Returns ``(target, df)``: on a cache miss ``df`` is the cleaned frame
+    that was written, so a caller running in this process can use it
+    instead of reading it back; on a hit it is None.
+    """
+    _pyarrow()
+    target = cache_path(path, cache_dir, fmt)
+    if os.path.exists(target):
+        _touch(target)
+        return target, None
+    return target, _build(path, target, fmt, chunksize)
+
+
+def ensure_cached(path=DATA_FILE, cache_dir=CACHE_DIR, fmt='feather',
+                  chunksize=None):
+    """Build the cached cleaned frame if needed and return its path."""
+    return build_if_missing(path, cache_dir, fmt, chunksize)[0]
+
+
+def load_clean(path=DATA_FILE, cache_dir=CACHE_DIR, fmt='feather',
+               chunksize=None):
+    """Return the cleaned appointments frame, from the cache when possible.
+
+    On a cache miss the CSV is loaded and cleaned, and the result is written
+    to ``cache_dir`` for the next run. Pass ``cache_dir=None`` to bypass the
+    cache.
+    """
+    if cache_dir is None:
+        return clean_appointments(load_appointments(path, chunksize))
+    _pyarrow()
+    target = cache_path(path, cache_dir, fmt)
+    if os.path.exists(target):
+        _touch(target)
+        with stage('cache.read') as record:
+            df = read_frame(target, fmt)
+            record.rows_out = len(df)
+        return df
+    return _build(path, target, fmt, chunksize)
@@ -0,0 +1,82 @@
+"""Derived columns and cleaning rules of the Data Wrangling section.
+
+The notebook finds and drops bad rows one query at a time (Age == -1, then
+Waiting_Days < 0), rebuilding the frame after each drop. Here every rule is
+declared once in RULES: rules with a ``fix`` rewrite the matching rows in
+place, the others reject them. The rejection masks are OR-ed together and the
+frame is filtered a single time, however many rules there are, and a
+per-rule report says how many rows each rule touched.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .features import add_date_features
+from .instrument import stage
+
+# Bump whenever the derived columns or the cleaning rules change, so cached
+# cleaned frames built by older rules are not reused.
+CLEANING_VERSION = 2
+
+# ``match(df)`` returns a boolean array of the rows the rule applies to.
+# ``fix(df, mask)`` repairs those rows in place; without it they are dropped.
+Rule = namedtuple('Rule', ['name', 'description', 'match', 'fix'])
+Rule.__new__.__defaults__ = (None,)
+
+
+# Waiting_Days counts calendar days, so same-day appointments are already 0
+# and need no fix rule (see features.py)
+RULES = [
+    Rule('invalid_age', 'Age below 0',
+         lambda df: df['Age'].to_numpy() < 0),
+    Rule('negative_waiting_days', 'Appointment_Day before Scheduled_Day',
+         lambda df: df['Waiting_Days'].to_numpy() < 0),
+]
+
+
+def add_derived_columns(df):
+    """Add the date features of features.py to a loaded frame (in place)."""
+    with stage('derive', len(df)) as record:
+        add_date_features(df)
+        record.rows_out = len(df)
+    return df
+
+
+def apply_rules(df, rules=RULES):
+    """Apply cleaning rules to ``df`` and filter it once.
+
+    Rules run in order, so a fix is visible to the rules after it. Returns
+    the cleaned frame (with a fresh RangeIndex) and a report indexed by rule
+    name with the action taken and the number of rows the rule matched.
+    """
+    reject = np.zeros(len(df), dtype=bool)
+    report = []
+    for rule in rules:
+        with stage('clean.' + rule.name, len(df)) as record:
+            mask = rule.match(df)
+            matched = int(mask.sum())
+            if rule.fix is not None:
+                if matched:
+                    rule.fix(df, mask)
+                action = 'fix'
+                record.rows_out = len(df)
+            else:
+                reject |= mask
+                action = 'drop'
+                record.rows_out = len(df) - matched
+        report.append((rule.name, rule.description, action, matched))
+    report = pd.DataFrame(report, columns=['rule', 'description', 'action',
+                                           'rows']).set_index('rule')
+    with stage('clean.filter', len(df)) as record:
+        if reject.any():
+            df = df.iloc[np.flatnonzero(~reject)]
+        df = df.reset_index(drop=True)
+        record.rows_out = len(df)
+    return df, report
+
+
+def clean_appointments(df, rules=RULES):
+    """Return the cleaned frame used by the Exploratory Data Analysis."""
+    return apply_rules(add_derived_columns(df), rules)[0]
@@ -0,0 +1,222 @@
+"""Command-line entry point: ``python -m noshow``.
+
+Runs selected questions of the analysis outside Jupyter, e.g.::
+
+    python -m noshow --questions 2,6,8 --input noshowappointments-kagglev2-may-2016.csv --output figures
+
+Only what the selected questions need is imported: scipy is loaded by the
+questions that run a statistical test, and matplotlib only when figures are
+written (``--output``). The notebook's display-only steps (head, info,
+describe) are not run. With pyarrow installed the cleaned frame is cached
+(see noshow.cache), so later runs skip the CSV entirely, and the questions'
+results are memoised (see noshow.memo), so only questions whose input
+columns changed are recomputed.
+"""
+
+import argparse
+import os
+import sys
+
+from . import instrument
+from .loader import DATA_FILE
+from .memo import MEMO_DIR
+from .questions import QUESTIONS
+
+
+def parse_questions(text):
+    if text == 'all':
+        return sorted(QUESTIONS)
+    try:
+        numbers = sorted({int(part) for part in text.split(',') if part})
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'expected question numbers like 2,6,8 or "all"') from None
+    unknown = [n for n in numbers if n not in QUESTIONS]
+    if unknown or not numbers:
+        raise argparse.ArgumentTypeError('questions must be between {} and {}'
+                                         .format(min(QUESTIONS), max(QUESTIONS)))
+    return numbers
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m noshow',
+        description='Answer the questions of the No-show appointments '
+                    'analysis.')
+    parser.add_argument('--questions', type=parse_questions, default='all',
+                        help='comma-separated question numbers, or "all" '
+                             '(default)')
+    parser.add_argument('--input', default=DATA_FILE,
+                        help='appointments CSV (default: %(default)s)')
+    parser.add_argument('--output',
+                        help='directory for the figures; none are drawn '
+                             'without it')
+    parser.add_argument('--format', default='png',
+                        help='comma-separated figure formats (default: png)')
+    parser.add_argument('--cache-dir', default='.noshow_cache',
+                        help='cleaned-frame cache (default: %(default)s)')
+    parser.add_argument('--no-cache', dest='cache_dir', action='store_const',
+                        const=None, help='always load and clean the CSV')
+    parser.add_argument('--memo-dir', default=MEMO_DIR,
+                        help='memoised question results (default: '
+                             '%(default)s)')
+    parser.add_argument('--no-memo', dest='memo_dir', action='store_const',
+                        const=None, help='always recompute the questions')
+    parser.add_argument('--chunksize', type=int,
+                        help='read the CSV in chunks of this many rows')
+    parser.add_argument('--backend', choices=['memory', 'chunked'],
+                        default='memory',
+                        help='"chunked" streams the CSV in --chunksize rows '
+                             'for files larger than memory (default: '
+                             '%(default)s)')
+    parser.add_argument('--sketch', action='store_true',
+                        help='instead of the questions, stream the CSV and '
+                             'print approximate distinct counts, top repeat '
+                             'patients and neighbourhoods and Age/'
+                             'Waiting_Days quantiles in fixed memory')
+    parser.add_argument('--check', action='store_true',
+                        help='instead of the questions, report duplicate '
+                             'rows and Appointment_IDs and out-of-range '
+                             'values of the CSV')
+    parser.add_argument('--hash-store',
+                        help='with --check, .npz file of the hashes of the '
+                             'records already checked; the CSV is checked '
+                             'against it and then added to it')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (default: 1, needs pyarrow '
+                             'for more)')
+    parser.add_argument('--profile',
+                        help='write per-stage timings to this file '
+                             '(.prom for Prometheus text, JSON otherwise)')
+    return parser
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def format_result(number, result):
+    """Plain-text summary of a question's result."""
+    lines = ['Question {}: {}'.format(number, QUESTIONS[number].title)]
+    for name, value in result.items():
+        if isinstance(value, dict):
+            for key, item in value.items():
+                lines.append(_format_value(key, item))
+        else:
+            lines.append(_format_value(name, value))
+    return '\n'.join(lines) + '\n'
+
+
+def _format_value(name, value):
+    if hasattr(value, 'counts') and hasattr(value, 'chi2'):
+        return '{}:\n{}\nchi2={:.4f}  dof={}  p={:.4g}\n'.format(
+            name, value.counts.to_string(), value.chi2, value.dof, value.p)
+    if hasattr(value, 'statistic') and hasattr(value, 'ci_low'):
+        return ('{}: t={:.4f}  dof={:.1f}  p={:.4g}  difference={:.4f} '
+                '[{:.4f}, {:.4f}]\n'.format(name, value.statistic, value.dof,
+                                            value.p, value.difference,
+                                            value.ci_low, value.ci_high))
+    if hasattr(value, 'to_string'):
+        return '{}:\n{}\n'.format(name, value.to_string())
+    return '{}: {}\n'.format(name, value)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        instrument.enable()
+    try:
+        return _main(args)
+    finally:
+        # Whichever way the run ends (--sketch, --check, an error)
+        if args.profile:
+            _write_profile(args.profile)
+
+
+def _main(args):
+    formats = tuple(f.strip() for f in args.format.split(',') if f.strip())
+    if not os.path.exists(args.input):
+        print('input file not found: {}'.format(args.input), file=sys.stderr)
+        return 2
+
+    if args.sketch:
+        sys.stdout.write(_sketch_summary(args))
+        return 0
+    if args.check:
+        sys.stdout.write(_integrity_report(args))
+        return 0
+    if args.backend == 'chunked':
+        results = _run_chunked(args, formats)
+    else:
+        results = _run_in_memory(args, formats)
+
+    for number in args.questions:
+        result, paths = results[number]
+        sys.stdout.write(format_result(number, result))
+        for path in paths:
+            sys.stdout.write('figure: {}\n'.format(path))
+        sys.stdout.write('\n')
+    return 0
+
+
+def _write_profile(path):
+    recorder = instrument.RECORDER
+    with open(path, 'w') as f:
+        f.write(recorder.to_prometheus() if path.endswith('.prom')
+                else recorder.to_json(indent=2))
+
+
+def _run_in_memory(args, formats):
+    from .runner import run_questions
+    if args.cache_dir is not None and _have_pyarrow():
+        from .cache import build_if_missing
+        source, df = build_if_missing(args.input, args.cache_dir,
+                                      chunksize=args.chunksize)
+        if df is not None and args.workers == 1:
+            # Just built: run on it rather than reading it back
+            source = df
+    else:
+        from .cache import load_clean
+        source = load_clean(args.input, None, chunksize=args.chunksize)
+    return run_questions(source, args.questions, args.workers, args.output,
+                         formats, args.memo_dir)
+
+
+def _run_chunked(args, formats):
+    from .outofcore import run_out_of_core
+    results = run_out_of_core(args.input, args.questions,
+                              args.chunksize or 1000000)
+    paths = {number: [] for number in results}
+    if args.output is not None:
+        from .report import render
+        os.makedirs(args.output, exist_ok=True)
+        for number, result in results.items():
+            paths[number] = render(number, result, args.output, formats)
+    return {number: (result, paths[number])
+            for number, result in results.items()}
+
+
+def _sketch_summary(args):
+    from .sketches import SketchAggregator
+    sketches = SketchAggregator().update_csv(args.input,
+                                             args.chunksize or 1000000)
+    return '\n'.join([
+        'Distinct ids (approximate):', sketches.distinct().to_string(), '',
+        'Top repeat patients:',
+        sketches.repeat_patients.top().to_string(), '',
+        'Top neighbourhoods by no-shows:',
+        sketches.no_show_neighbourhoods.top().to_string(), '',
+        'Age and Waiting_Days:', sketches.describe().to_string(), ''])
+
+
+def _integrity_report(args):
+    from .integrity import HashStore, check_csv
+    store = HashStore.load(args.hash_store) if args.hash_store else None
+    report = check_csv(args.input, store, args.chunksize or 1000000)
+    if args.hash_store:
+        store.save(args.hash_store)
+    return report.to_string() + '\n'
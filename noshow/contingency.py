@@ -0,0 +1,122 @@
+"""Contingency tables of the categorical variables against No_Show.
+
+The notebook builds a ``pd.crosstab`` per variable for the plots and then a
+second one per variable for ``chi2_contingency``. Here No_Show is encoded
+once, every variable is reduced to integer codes, and each table is a single
+``np.bincount`` over ``codes * n_classes + target_codes``. The counts and
+their chi-square test come back together, and the row proportions used by
+the plots are derived from the same counts, so plots and tests share one
+computation. Tests only ever see the counts.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .stats import chi2_batch, chi2_results, stack_tables
+
+# Categorical variables of Questions 3, 4, 5 and 7
+CATEGORICAL = ['Gender', 'Scholarship', 'Hipertension', 'Diabetes',
+               'Alcoholism', 'Handcap', 'SMS_received', 'Appointment_Weekday']
+
+
+class Contingency(namedtuple('Contingency', ['counts', 'chi2', 'p', 'dof'])):
+    """Count table of a variable vs No_Show and its chi-square test."""
+
+    __slots__ = ()
+
+    @property
+    def proportions(self):
+        """Row proportions of the counts, for the stacked bar plots."""
+        return self.counts.div(self.counts.sum(axis=1), axis=0)
+
+
+def encode(series, sort=True):
+    """Integer codes (-1 for missing) and levels of a column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, levels = pd.factorize(series, sort=sort)
+    return codes, pd.Index(levels)
+
+
+def count_table(codes, levels, target_codes, classes):
+    """Count table of two code arrays, without levels that never occur."""
+    n_classes = len(classes)
+    valid = (codes >= 0) & (target_codes >= 0)
+    if not valid.all():
+        codes, target_codes = codes[valid], target_codes[valid]
+    flat = codes.astype(np.int64) * n_classes + target_codes
+    counts = np.bincount(flat, minlength=len(levels) * n_classes)
+    counts = counts.reshape(len(levels), n_classes)
+    seen = counts.sum(axis=1) > 0
+    return pd.DataFrame(counts[seen], index=levels[seen],
+                        columns=pd.Index(classes))
+
+
+def contingency_tables(df, columns=CATEGORICAL, target='No_Show'):
+    """Counts and chi-square test of each column vs target.
+
+    Returns a dict mapping each column name to a Contingency whose counts
+    (and derived proportions) are DataFrames indexed by the column's levels,
+    with one column per target class (No, Yes).
+    """
+    target_codes, classes = encode(df[target])
+    classes = classes.rename(target)
+    counts = []
+    for col in columns:
+        codes, levels = encode(df[col])
+        counts.append(count_table(codes, levels.rename(col), target_codes,
+                                  classes))
+    # All the tests in one batch
+    tests = chi2_batch(stack_tables([c.to_numpy() for c in counts]))
+    tables = {}
+    for i, (col, table) in enumerate(zip(columns, counts)):
+        tables[col] = Contingency(table, tests.chi2[i], tests.p[i],
+                                  int(tests.dof[i]))
+    return tables
+
+
+def chi2_summary(tables):
+    """One row per variable with its chi-square statistic, dof and p-value."""
+    return pd.DataFrame({'chi2': [t.chi2 for t in tables.values()],
+                         'dof': [t.dof for t in tables.values()],
+                         'p': [t.p for t in tables.values()]},
+                        index=pd.Index(list(tables), name='variable'))
+
+
+def stratified_counts(df, column, strata, target='No_Show'):
+    """Count tables of ``column`` vs target within each level of ``strata``.
+
+    Returns the strata levels and an ``(n_strata, n_levels, n_classes)``
+    array built with one bincount, ready for chi2_batch.
+    """
+    target_codes, classes = encode(df[target])
+    codes, levels = encode(df[column])
+    strata_codes, strata_levels = encode(df[strata])
+    valid = (codes >= 0) & (target_codes >= 0) & (strata_codes >= 0)
+    shape = (len(strata_levels), len(levels), len(classes))
+    flat = np.ravel_multi_index((strata_codes[valid].astype(np.int64),
+                                 codes[valid], target_codes[valid]), shape)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    return strata_levels, counts
+
+
+def stratified_chi2(df, columns, strata, target='No_Show', adjust='fdr_bh',
+                    alpha=0.05):
+    """Chi-square test of every column vs target within every stratum.
+
+    For example ``stratified_chi2(df, CATEGORICAL, 'Neighbourhood')`` runs
+    all neighbourhood x variable tests in one batch and corrects the
+    p-values for the number of tests.
+    """
+    blocks, keys = [], []
+    for col in columns:
+        strata_levels, counts = stratified_counts(df, col, strata, target)
+        blocks.append(counts)
+        keys.extend((level, col) for level in strata_levels)
+    rows = max(b.shape[1] for b in blocks)
+    tables = np.concatenate([np.pad(b, ((0, 0), (0, rows - b.shape[1]), (0, 0)))
+                             for b in blocks])
+    index = pd.MultiIndex.from_tuples(keys, names=[strata, 'variable'])
+    return chi2_results(tables, index, adjust, alpha)
@@ -0,0 +1,138 @@
+"""Date features computed with integer arithmetic on the timestamp arrays.
+
+The notebook derives Waiting_Days as ``(Appointment_Day - Scheduled_Day)
+.dt.days``. That floors a timedelta, not a count of calendar days, so every
+same-day appointment comes out as -1 (Appointment_Day has no time) and has to
+be patched with ``replace(-1, 0)``. Appointment_Weekday is a Python string per
+row from ``dt.weekday_name``, which newer pandas no longer has. Here the
+timestamps are read as int64 seconds since the epoch and every feature is a
+few vectorised integer operations on them:
+
+* Waiting_Days: calendar days between the two dates (int16, same day = 0);
+* Appointment_Weekday: int8 weekday codes behind an ordered categorical;
+* Scheduled_Hour: hour the appointment was booked (int8);
+* Lead_Time: Waiting_Days bucketed into LEAD_TIMES (categorical).
+
+The export writes every timestamp as ``YYYY-MM-DDTHH:MM:SSZ``, so
+parse_timestamps turns those strings into seconds directly, several times
+faster than pandas' generic parser, which is kept as the fallback for any
+other format.
+"""
+
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_DAY = 86400
+
+WEEKDAYS = pd.CategoricalDtype(['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                'Friday', 'Saturday', 'Sunday'], ordered=True)
+# 1970-01-01, day 0, was a Thursday
+EPOCH_WEEKDAY = 3
+
+# Lower bound (in days) of every lead-time bucket but the first
+LEAD_TIME_EDGES = np.array([1, 8, 31, 91])
+LEAD_TIMES = pd.CategoricalDtype(['Same day', '1-7 days', '8-30 days',
+                                  '31-90 days', '91+ days'], ordered=True)
+
+# ``YYYY-MM-DDTHH:MM:SSZ``: positions of the separators and of each field
+_SEPARATORS = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':', 19: b'Z'}
+_DIGITS = [i for i in range(19) if i not in _SEPARATORS]
+# Days in each month (index 1-12) of a leap year
+_MONTH_DAYS = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _field(chars, start, stop):
+    value = chars[:, start].astype(np.int32) - 48
+    for i in range(start + 1, stop):
+        value *= 10
+        value += chars[:, i]
+        value -= 48
+    return value
+
+
+def _iso_seconds(values):
+    """Seconds since the epoch of ISO 8601 UTC strings, or None."""
+    try:
+        raw = np.asarray(values, dtype='S21')
+    except UnicodeEncodeError:
+        return None
+    chars = raw.view(np.uint8).reshape(len(raw), 21)
+    if chars[:, 20].any() or (chars[:, _DIGITS] - 48 > 9).any():
+        return None
+    for position, char in _SEPARATORS.items():
+        if (chars[:, position] != ord(char)).any():
+            return None
+    year, month, day = _field(chars, 0, 4), _field(chars, 5, 7), \
+        _field(chars, 8, 10)
+    hour, minute, second = _field(chars, 11, 13), _field(chars, 14, 16), \
+        _field(chars, 17, 19)
+    # Out-of-range fields are left to pandas, which raises on them
+    if ((month < 1) | (month > 12)).any():
+        return None
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    last_day = _MONTH_DAYS[month] - ((month == 2) & ~leap)
+    if (((day < 1) | (day > last_day)).any() or (hour > 23).any()
+            or (minute > 59).any() or (second > 59).any()):
+        return None
+    # Days since 1970-01-01 of a proleptic Gregorian date, counting years
+    # from March so the leap day is the last day of the year
+    year -= month <= 2
+    month += np.where(month > 2, -3, 9).astype(np.int32)
+    days = (year * 365 + year // 4 - year // 100 + year // 400
+            + (153 * month + 2) // 5 + day - 719469)
+    seconds = days.astype(np.int64) * SECONDS_PER_DAY
+    seconds += hour * 3600 + minute * 60 + second
+    return seconds
+
+
+def parse_timestamps(values):
+    """UTC datetime Series of timestamp strings."""
+    values = pd.Series(values)
+    seconds = _iso_seconds(values.to_numpy(dtype=object)) \
+        if len(values) else None
+    if seconds is None:
+        return pd.to_datetime(values, format='ISO8601', utc=True)
+    return pd.Series(seconds.view('datetime64[s]'), index=values.index,
+                     name=values.name).dt.tz_localize('UTC')
+
+
+def epoch_seconds(series):
+    """int64 seconds since the epoch of a (possibly tz-aware) datetime column."""
+    return series.values.astype('datetime64[s]').view(np.int64)
+
+
+def day_numbers(seconds):
+    """Calendar day (days since 1970-01-01) of epoch seconds."""
+    return seconds // SECONDS_PER_DAY
+
+
+def weekday_codes(days):
+    """Weekday of day numbers as int8 codes, Monday = 0."""
+    return ((days + EPOCH_WEEKDAY) % 7).astype(np.int8)
+
+
+def hours(seconds):
+    """Hour of the day (0-23) of epoch seconds as int8."""
+    return (seconds % SECONDS_PER_DAY // 3600).astype(np.int8)
+
+
+def lead_time_codes(waiting_days):
+    """LEAD_TIMES codes of Waiting_Days (-1, i.e. missing, when negative)."""
+    codes = np.searchsorted(LEAD_TIME_EDGES, waiting_days, side='right')
+    codes = codes.astype(np.int8)
+    codes[waiting_days < 0] = -1
+    return codes
+
+
+def add_date_features(df):
+    """Add Waiting_Days, Appointment_Weekday, Scheduled_Hour and Lead_Time."""
+    scheduled = epoch_seconds(df['Scheduled_Day'])
+    appointment_days = day_numbers(epoch_seconds(df['Appointment_Day']))
+    waiting = (appointment_days - day_numbers(scheduled)).astype(np.int16)
+    df['Waiting_Days'] = waiting
+    df['Appointment_Weekday'] = pd.Categorical.from_codes(
+        weekday_codes(appointment_days), dtype=WEEKDAYS)
+    df['Scheduled_Hour'] = hours(scheduled)
+    df['Lead_Time'] = pd.Categorical.from_codes(lead_time_codes(waiting),
+                                                dtype=LEAD_TIMES)
+    return df
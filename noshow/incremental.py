@@ -0,0 +1,144 @@
+"""Incremental show-rate statistics over appended appointment data.
+
+Rerunning the analysis over the whole history for every new day of data
+repeats all the group-bys. A ShowRateAggregator instead keeps mergeable
+sufficient statistics: the counts per (variable, level, No_Show) -- which
+include the Age and Waiting_Days histograms -- and the moments (count, mean,
+sum of squared deviations) of Age and Waiting_Days per No_Show class. New
+chunks are added with ``update``, aggregators built elsewhere with
+``merge``, and Questions 1-8 are answered from the statistics alone, so a
+day's ingest costs time proportional to that day's rows.
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import clean_appointments
+from .contingency import CATEGORICAL, Contingency, count_table, encode
+from .loader import DATA_FILE, iter_appointments
+from .stats import Moments, chi2_batch, group_moments, ttest_moments
+
+# Variables whose (level, No_Show) counts are kept
+TRACKED = CATEGORICAL + ['Neighbourhood', 'Age', 'Waiting_Days']
+TARGET = 'No_Show'
+CLASSES = pd.Index(['No', 'Yes'], name=TARGET)
+# Numeric variables whose moments per No_Show class are kept
+NUMERIC = ['Age', 'Waiting_Days']
+
+
+class ShowRateAggregator(object):
+    """Mergeable counts and moments for the questions of the analysis.
+
+    Chunks given to ``update`` must be cleaned frames (see
+    ``clean_appointments``); ``update_csv`` loads and cleans a CSV chunk by
+    chunk.
+    """
+
+    def __init__(self, variables=TRACKED):
+        self.variables = list(variables)
+        self.counts = {var: pd.DataFrame(np.zeros((0, len(CLASSES)), np.int64),
+                                         columns=CLASSES)
+                       for var in self.variables}
+        # Declared level order of ordered categoricals (e.g. Monday..Sunday)
+        self.orders = {}
+        empty = Moments(np.zeros(len(CLASSES), np.int64),
+                        np.zeros(len(CLASSES)), np.zeros(len(CLASSES)))
+        self.moments = {var: empty for var in NUMERIC}
+
+    @property
+    def rows(self):
+        return int(self.moments['Age'].n.sum())
+
+    def update(self, chunk):
+        """Add the rows of a cleaned chunk to the statistics."""
+        target_codes, classes = encode(chunk[TARGET])
+        if list(classes) != list(CLASSES):
+            # Align the chunk's class codes on No/Yes; missing (-1) picks
+            # the -1 appended at the end and stays missing
+            mapping = np.append(CLASSES.get_indexer(classes), -1)
+            target_codes = mapping[target_codes]
+        for var in self.variables:
+            dtype = chunk[var].dtype
+            if isinstance(dtype, pd.CategoricalDtype) and dtype.ordered:
+                self.orders[var] = list(dtype.categories)
+            codes, levels = encode(chunk[var])
+            table = count_table(codes, levels.rename(var), target_codes, CLASSES)
+            self._add_counts(var, table)
+        for var in NUMERIC:
+            chunk_moments = group_moments(chunk[var].to_numpy(), target_codes,
+                                          len(CLASSES))
+            self.moments[var] = self.moments[var].merge(chunk_moments)
+        return self
+
+    def update_csv(self, path=DATA_FILE, chunksize=1000000):
+        """Load, clean and add a CSV export one chunk at a time."""
+        for chunk in iter_appointments(path, chunksize):
+            self.update(clean_appointments(chunk))
+        return self
+
+    def merge(self, other):
+        """Add the statistics of another aggregator to this one."""
+        if other.variables != self.variables:
+            raise ValueError('cannot merge aggregators tracking different '
+                             'variables')
+        self.orders.update(other.orders)
+        for var in self.variables:
+            self._add_counts(var, other.counts[var])
+        for var in NUMERIC:
+            self.moments[var] = self.moments[var].merge(other.moments[var])
+        return self
+
+    def _add_counts(self, var, table):
+        current = self.counts[var]
+        if current.empty:
+            merged = table.astype(np.int64)
+        else:
+            merged = current.add(table, fill_value=0).astype(np.int64)
+        if var in self.orders:
+            merged = merged.reindex([level for level in self.orders[var]
+                                     if level in merged.index])
+        else:
+            merged = merged.sort_index()
+        merged.index.name = var
+        self.counts[var] = merged
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    # Answers to the questions
+
+    def show_proportions(self):
+        """Question 1: proportion of shows (No) and no-shows (Yes)."""
+        n = self.moments['Age'].n
+        return pd.Series(n / n.sum(), index=CLASSES)
+
+    def describe(self, var='Age'):
+        """Question 2: count, mean and sample variance of ``var`` per class."""
+        moments = self.moments[var]
+        return pd.DataFrame({'n': moments.n, 'mean': moments.mean,
+                             'var': moments.var}, index=CLASSES)
+
+    def ttest(self, var='Age', equal_var=True, alpha=0.05):
+        """Question 2: t-test of the mean of ``var``, shows vs no-shows."""
+        moments = self.moments[var]
+        return ttest_moments(moments.group(0), moments.group(1), equal_var,
+                             alpha)
+
+    def contingency(self, var):
+        """Questions 2-5, 7 and 8: counts of ``var`` vs No_Show and its test."""
+        counts = self.counts[var]
+        test = chi2_batch(counts.to_numpy()[np.newaxis])
+        return Contingency(counts, test.chi2[0], test.p[0], int(test.dof[0]))
+
+    def top_neighbourhoods(self, k=10):
+        """Question 6: the ``k`` neighbourhoods with the most no-shows."""
+        no_shows = self.counts['Neighbourhood']['Yes']
+        return no_shows.nlargest(k)
@@ -0,0 +1,202 @@
+"""Per-stage timing and memory instrumentation.
+
+The pipeline wraps each named stage (load, derive, every cleaning rule, every
+question, ...) in ``stage(name)``. While instrumentation is disabled -- the
+default -- ``stage`` returns a shared no-op context manager, so the cost is
+one attribute check per stage. Once enabled, every stage records its wall
+and CPU time, rows in and out, the change in resident memory and, with
+``trace_memory=True``, the tracemalloc allocation delta and peak. Records
+can be exported as JSON or in the Prometheus text format.
+
+    from noshow import instrument
+    instrument.enable()
+    ...run the pipeline...
+    print(instrument.RECORDER.to_prometheus())
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+_MB = 1024 * 1024
+
+
+def rss_mb():
+    """Current resident set size in MB (0 where it cannot be read)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / _MB
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def reset_peak_rss():
+    """Reset the RSS high-water mark (Linux only); True if it worked."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size in MB since start or the last reset."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / _MB if sys.platform == 'darwin' else peak / 1024
+
+
+class StageRecord(object):
+    """Measurements of one run of a stage; set ``rows_out`` inside the block."""
+
+    __slots__ = ('name', 'rows_in', 'rows_out', 'wall_s', 'cpu_s',
+                 'rss_delta_mb', 'alloc_delta_mb', 'alloc_peak_mb')
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_s = self.cpu_s = self.rss_delta_mb = None
+        self.alloc_delta_mb = self.alloc_peak_mb = None
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class _NullStage(object):
+    """Context manager used while instrumentation is disabled."""
+
+    __slots__ = ('rows_out',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullStage()
+
+
+class _Stage(object):
+    __slots__ = ('recorder', 'record', '_wall', '_cpu', '_rss', '_alloc')
+
+    def __init__(self, recorder, record):
+        self.recorder = recorder
+        self.record = record
+
+    def __enter__(self):
+        if self.recorder.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._alloc = tracemalloc.get_traced_memory()[0]
+        self._rss = rss_mb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        record = self.record
+        record.wall_s = time.perf_counter() - self._wall
+        record.cpu_s = time.process_time() - self._cpu
+        record.rss_delta_mb = rss_mb() - self._rss
+        if self.recorder.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record.alloc_delta_mb = (current - self._alloc) / _MB
+            record.alloc_peak_mb = (peak - self._alloc) / _MB
+        self.recorder.records.append(record)
+        return False
+
+
+class Recorder(object):
+    """Collects StageRecords for the stages run while it is enabled."""
+
+    def __init__(self, enabled=False, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def stage(self, name, rows_in=None):
+        """Context manager measuring the block as stage ``name``."""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, StageRecord(name, rows_in))
+
+    def reset(self):
+        self.records = []
+
+    def to_json(self, **kwargs):
+        return json.dumps([r.as_dict() for r in self.records], **kwargs)
+
+    def to_prometheus(self, prefix='noshow_stage'):
+        """Prometheus text exposition of the records, totalled per stage."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record.name, {
+                'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'rows_in': 0, 'rows_out': 0, 'rss_delta_mb_max': None,
+                'alloc_peak_mb_max': None})
+            total['calls'] += 1
+            total['wall_seconds'] += record.wall_s
+            total['cpu_seconds'] += record.cpu_s
+            total['rows_in'] += record.rows_in or 0
+            total['rows_out'] += record.rows_out or 0
+            for key, value in (('rss_delta_mb_max', record.rss_delta_mb),
+                               ('alloc_peak_mb_max', record.alloc_peak_mb)):
+                if value is not None:
+                    total[key] = value if total[key] is None else max(total[key],
+                                                                      value)
+        metrics = [('calls', 'counter', 'Number of runs of the stage.'),
+                   ('wall_seconds', 'counter', 'Wall time spent in the stage.'),
+                   ('cpu_seconds', 'counter', 'CPU time spent in the stage.'),
+                   ('rows_in', 'counter', 'Rows given to the stage.'),
+                   ('rows_out', 'counter', 'Rows returned by the stage.'),
+                   ('rss_delta_mb_max', 'gauge',
+                    'Largest change in resident memory over one run, MB.'),
+                   ('alloc_peak_mb_max', 'gauge',
+                    'Largest traced allocation peak over one run, MB.')]
+        lines = []
+        for key, kind, help_text in metrics:
+            name = '{}_{}{}'.format(prefix, key,
+                                    '_total' if kind == 'counter' else '')
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for stage_name, total in totals.items():
+                if total[key] is None:
+                    continue
+                lines.append('{}{{stage="{}"}} {}'.format(
+                    name, stage_name.replace('"', '\\"'), total[key]))
+        return '\n'.join(lines) + '\n'
+
+
+# Recorder used by the pipeline
+RECORDER = Recorder()
+
+
+def stage(name, rows_in=None):
+    """Measure a block as stage ``name`` on the pipeline's recorder."""
+    return RECORDER.stage(name, rows_in)
+
+
+def enable(trace_memory=False):
+    RECORDER.enabled = True
+    RECORDER.trace_memory = trace_memory
+    return RECORDER
+
+
+def disable():
+    RECORDER.enabled = False
+    return RECORDER
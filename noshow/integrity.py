@@ -0,0 +1,168 @@
+"""Duplicate and range checks of the appointment records in one pass.
+
+The notebook checks integrity piecemeal: ``sum(df.duplicated())`` hashes
+every column of every row and sums the flags in Python, Patient_Id and
+Appointment_ID are checked for duplicates separately, and the range problems
+(Age == -1, Handcap above 1, appointments before their scheduling day) are
+found by separate queries. Here every row gets one 64-bit hash, chained from
+vectorised per-column hashes (see noshow.sketches.hash64), and the ids get
+their own hashes; duplicates are found by sorting the hashes, and the range
+checks of CHECKS are evaluated on the same frame, giving a one-line-per-check
+report.
+
+For incremental loads the row and id hashes of the data already checked are
+kept in a HashStore (one sorted uint64 array per kind, saved as .npz), so a
+new export only hashes its own rows and looks them up in the store.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import RULES
+from .features import day_numbers, epoch_seconds
+from .instrument import stage
+from .loader import COLUMNS, DATA_FILE, iter_appointments
+from .sketches import hash64, mix64
+
+# Bump when the hashing changes, so stores of older hashes are not mixed in
+HASH_VERSION = 2
+# Columns with their own duplicate check
+KEYS = ['Appointment_ID']
+
+# ``match(df)`` returns a boolean array of the rows violating the check
+Check = namedtuple('Check', ['name', 'description', 'match'])
+
+# The cleaning rule, so both report the same rows
+_INVALID_AGE = next(rule for rule in RULES if rule.name == 'invalid_age')
+
+CHECKS = [
+    Check(_INVALID_AGE.name, _INVALID_AGE.description, _INVALID_AGE.match),
+    Check('handcap_range', 'Handcap above 1 (not a 0/1 flag)',
+          lambda df: df['Handcap'].to_numpy() > 1),
+    Check('appointment_before_scheduled',
+          'Appointment_Day earlier than the Scheduled_Day date',
+          lambda df: day_numbers(epoch_seconds(df['Appointment_Day']))
+          < day_numbers(epoch_seconds(df['Scheduled_Day']))),
+]
+
+
+def row_hashes(df, columns=None):
+    """One 64-bit hash per row of ``columns`` (default: the CSV's columns)."""
+    if columns is None:
+        columns = [c for c in COLUMNS.values() if c in df.columns]
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for column in columns:
+        hashes = mix64(hashes ^ hash64(df[column]))
+    return hashes
+
+
+def duplicated(hashes, known=None):
+    """Mask of hashes seen earlier in ``hashes`` or in sorted ``known``.
+
+    As ``DataFrame.duplicated()``, the first occurrence within ``hashes`` is
+    not flagged (unless it is in ``known``).
+    """
+    mask = np.ones(len(hashes), dtype=bool)
+    _, first = np.unique(hashes, return_index=True)
+    mask[first] = False
+    if known is not None and len(known):
+        position = np.searchsorted(known, hashes).clip(max=len(known) - 1)
+        mask |= known[position] == hashes
+    return mask
+
+
+class HashStore(object):
+    """Sorted row and key hashes of the records already checked."""
+
+    def __init__(self, hashes=None):
+        self.hashes = {kind: np.zeros(0, dtype=np.uint64)
+                       for kind in ['rows'] + KEYS}
+        self.hashes.update(hashes or {})
+
+    def __len__(self):
+        return len(self.hashes['rows'])
+
+    def add(self, kind, hashes):
+        self.hashes[kind] = np.union1d(self.hashes[kind], hashes)
+
+    @classmethod
+    def load(cls, path):
+        """Store saved at ``path``, or an empty one if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            if int(data['version']) != HASH_VERSION:
+                raise ValueError('{} holds hashes of another version; delete '
+                                 'it to rebuild'.format(path))
+            return cls({kind: data[kind] for kind in data.files
+                        if kind != 'version'})
+
+    def save(self, path):
+        """Write the store atomically to ``path`` (.npz)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, version=HASH_VERSION, **self.hashes)
+        os.replace(tmp, path)
+
+
+def check_integrity(df, store=None, checks=CHECKS, update=True):
+    """Duplicate and range violations of a loaded (uncleaned) frame.
+
+    Rows duplicate earlier rows of ``df`` or, with a HashStore, rows already
+    in the store; with ``update`` the store then takes in the hashes of
+    ``df``. Returns a report indexed by check name (description, number of
+    rows, first offending row labels) and a dict mapping each check to the
+    positions of its rows.
+    """
+    violations = {}
+    descriptions = {}
+    with stage('integrity', len(df)):
+        hashes = {'rows': row_hashes(df)}
+        hashes.update({key: hash64(df[key]) for key in KEYS})
+        for kind, values in hashes.items():
+            known = store.hashes[kind] if store is not None else None
+            name = 'duplicate_rows' if kind == 'rows' \
+                else 'duplicate_' + kind.lower()
+            violations[name] = np.flatnonzero(duplicated(values, known))
+            descriptions[name] = ('Exact copy of an earlier row'
+                                  if kind == 'rows'
+                                  else '{} already used'.format(kind))
+        for check in checks:
+            violations[check.name] = np.flatnonzero(check.match(df))
+            descriptions[check.name] = check.description
+        if store is not None and update:
+            for kind, values in hashes.items():
+                store.add(kind, values)
+    report = pd.DataFrame({
+        'description': pd.Series(descriptions),
+        'rows': pd.Series({name: len(rows)
+                           for name, rows in violations.items()}),
+        'examples': pd.Series({name: list(df.index[rows[:5]])
+                               for name, rows in violations.items()}),
+    })
+    report.index.name = 'check'
+    return report, violations
+
+
+def check_csv(path=DATA_FILE, store=None, chunksize=1000000):
+    """check_integrity of a CSV export read in chunks.
+
+    Duplicates across chunks are found through ``store`` (a temporary
+    HashStore when none is given), which ends up holding the file's hashes.
+    Returns the report summed over the chunks.
+    """
+    store = HashStore() if store is None else store
+    report = None
+    for chunk in iter_appointments(path, chunksize):
+        chunk_report, _ = check_integrity(chunk, store)
+        if report is None:
+            report = chunk_report
+        else:
+            report['rows'] += chunk_report['rows']
+            report['examples'] = [(a + b)[:5] for a, b in
+                                  zip(report['examples'],
+                                      chunk_report['examples'])]
+    return report
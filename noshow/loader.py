@@ -0,0 +1,126 @@
+"""Typed, optionally chunked loading of the No-show appointments CSV.
+
+The notebook loads the file with a bare ``pd.read_csv`` and then renames the
+columns, casts Patient_Id and parses both dates, copying the frame at every
+step. Here the columns are renamed and given compact dtypes while the CSV is
+being parsed, and the file can be streamed in chunks.
+"""
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from .features import parse_timestamps
+from .instrument import stage
+
+DATA_FILE = 'noshowappointments-kagglev2-may-2016.csv'
+
+# Header of the Kaggle export -> column name used in the analysis (file order)
+COLUMNS = {'PatientId': 'Patient_Id',
+           'AppointmentID': 'Appointment_ID',
+           'Gender': 'Gender',
+           'ScheduledDay': 'Scheduled_Day',
+           'AppointmentDay': 'Appointment_Day',
+           'Age': 'Age',
+           'Neighbourhood': 'Neighbourhood',
+           'Scholarship': 'Scholarship',
+           'Hipertension': 'Hipertension',
+           'Diabetes': 'Diabetes',
+           'Alcoholism': 'Alcoholism',
+           'Handcap': 'Handcap',
+           'SMS_received': 'SMS_received',
+           'No-show': 'No_Show'}
+
+# 0/1 flags (Handcap goes up to 4, so int8 rather than bool)
+FLAG_COLUMNS = ['Scholarship', 'Hipertension', 'Diabetes',
+                'Alcoholism', 'Handcap', 'SMS_received']
+DATE_COLUMNS = ['Scheduled_Day', 'Appointment_Day']
+
+GENDER = CategoricalDtype(['F', 'M'])
+NO_SHOW = CategoricalDtype(['No', 'Yes'])
+# Read as plain categoricals and checked against these after parsing, since
+# read_csv would quietly turn any other value into NaN
+CATEGORIES = {'Gender': GENDER, 'No_Show': NO_SHOW}
+
+# A few patient ids are written in scientific notation (e.g. 9377952927E-5),
+# so Patient_Id is parsed as float64 and truncated to int64 afterwards, the
+# same way the notebook's astype('int64') does.
+DTYPES = {'Patient_Id': 'float64',
+          'Appointment_ID': 'int64',
+          'Gender': 'category',
+          'Age': 'int16',
+          'Neighbourhood': 'category',
+          'No_Show': 'category'}
+DTYPES.update({var: 'int8' for var in FLAG_COLUMNS})
+# Dates are read as text and parsed by features.parse_timestamps, which is
+# much faster than read_csv's parse_dates on this fixed format
+DTYPES.update({var: 'str' for var in DATE_COLUMNS})
+
+
+def _read_options(path):
+    """Keyword arguments for read_csv, after checking the file's header."""
+    header = list(pd.read_csv(path, nrows=0).columns)
+    if header != list(COLUMNS):
+        raise ValueError('unexpected columns in {}: {}'.format(path, header))
+    return dict(header=0, names=list(COLUMNS.values()), dtype=DTYPES)
+
+
+def _finish(chunk):
+    for col, dtype in CATEGORIES.items():
+        unexpected = chunk[col].cat.categories.difference(dtype.categories)
+        if len(unexpected):
+            raise ValueError('unexpected {} values: {}'.format(
+                col, list(unexpected)))
+        chunk[col] = chunk[col].astype(dtype)
+    chunk['Patient_Id'] = chunk['Patient_Id'].astype('int64')
+    for col in DATE_COLUMNS:
+        chunk[col] = parse_timestamps(chunk[col])
+    return chunk
+
+
+def iter_appointments(path=DATA_FILE, chunksize=1000000):
+    """Yield the CSV as typed DataFrames of at most ``chunksize`` rows.
+
+    Every chunk already has the analysis column names and dtypes. The
+    Neighbourhood categories of a chunk only cover the values seen in that
+    chunk; use concat_chunks to put chunks back together.
+    """
+    reader = pd.read_csv(path, chunksize=chunksize, **_read_options(path))
+    for chunk in reader:
+        yield _finish(chunk)
+
+
+def concat_chunks(chunks):
+    """Concatenate typed chunks, unifying their categorical columns."""
+    chunks = list(chunks)
+    if not chunks:
+        raise ValueError('no chunks to concatenate')
+    for col in chunks[0].columns:
+        if not isinstance(chunks[0][col].dtype, CategoricalDtype):
+            continue
+        categories = set()
+        for chunk in chunks:
+            categories.update(chunk[col].cat.categories)
+        dtype = CategoricalDtype(sorted(categories))
+        for chunk in chunks:
+            chunk[col] = chunk[col].astype(dtype)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_appointments(path=DATA_FILE, chunksize=None):
+    """Load the appointments CSV with explicit dtypes.
+
+    Columns come back renamed (Patient_Id, Scheduled_Day, No_Show, ...), with
+    int64 ids, categorical Gender/Neighbourhood/No_Show, int8 flags and both
+    dates as UTC timestamps. A Gender other than F/M or a No_Show other than
+    No/Yes raises a ValueError (empty fields stay missing). With
+    ``chunksize`` the file is parsed in pieces, so peak memory is the typed
+    frame plus one chunk of raw text rather than the whole file parsed as
+    object columns.
+    """
+    with stage('load') as record:
+        if chunksize is None:
+            df = _finish(pd.read_csv(path, **_read_options(path)))
+        else:
+            df = concat_chunks(iter_appointments(path, chunksize))
+        record.rows_out = len(df)
+    return df
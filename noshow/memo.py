@@ -0,0 +1,201 @@
+"""On-disk memoisation of the questions' computed results.
+
+Rerunning the analysis to change one chart recomputes every crosstab,
+value_counts, t-test and chi-square test. Here each question's result (its
+tables and statistics, not its figures) is stored under a key made of
+
+* a fingerprint of the cleaned columns the question reads (the raw bytes of
+  each column, its dtype and categories, hashed with blake2b), and
+* the question's number, compute function, default and explicit parameters.
+
+A question whose columns and parameters are unchanged is read back from
+disk; any change to its input columns gives a new key and it is recomputed.
+Entries are pickles in one directory; reading one refreshes its modification
+time, and the least recently used entries are removed once the directory
+exceeds ``max_bytes`` (or ``max_entries``).
+"""
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .plan import plan_questions
+from .questions import QUESTIONS
+
+MEMO_DIR = os.path.join('.noshow_cache', 'results')
+# Bump when the structure of the results changes without a change of the
+# question functions' names or parameters
+MEMO_VERSION = 1
+
+_MISSING = object()
+
+
+def column_digest(series):
+    """Hex digest of a column's name, dtype and values."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((series.name, str(series.dtype))).encode())
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        digest.update(repr(list(series.cat.categories)).encode())
+        values = series.cat.codes.to_numpy()
+    elif isinstance(series.dtype, pd.DatetimeTZDtype):
+        values = series.values.view(np.int64)
+    else:
+        values = series.to_numpy()
+    if values.dtype == object:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    digest.update(np.ascontiguousarray(values).view(np.uint8))
+    return digest.hexdigest()
+
+
+def fingerprint(df, columns, digests=None):
+    """Digest of ``columns`` of ``df``; ``digests`` caches per-column hashes."""
+    digests = {} if digests is None else digests
+    combined = hashlib.blake2b(digest_size=16)
+    for column in sorted(columns):
+        if column not in digests:
+            digests[column] = column_digest(df[column])
+        combined.update(digests[column].encode())
+    return combined.hexdigest()
+
+
+def question_key(number, data_fingerprint, params=None):
+    """Cache key of question ``number`` on data with ``data_fingerprint``."""
+    compute = QUESTIONS[number].compute
+    parts = (MEMO_VERSION, number, compute.__module__, compute.__qualname__,
+             compute.__defaults__, sorted((params or {}).items()),
+             data_fingerprint)
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class ResultCache(object):
+    """Directory of pickled results with least-recently-used eviction."""
+
+    def __init__(self, directory=MEMO_DIR, max_bytes=256 << 20,
+                 max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key, default=None):
+        """The stored value of ``key``, or ``default``."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError):
+            # Truncated, or written by code that no longer exists
+            self._remove(path)
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store ``value`` under ``key`` (atomically) and evict if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        """``(mtime, size, path)`` of every entry, least recent first."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.pkl'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self):
+        """Remove least recently used entries beyond the size limits."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes and (self.max_entries is None
+                                            or count <= self.max_entries):
+                break
+            self._remove(path)
+            total -= size
+            count -= 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def question_result(df, number, cache=None, digests=None, **params):
+    """Result of question ``number`` on ``df``, memoised in ``cache``.
+
+    ``params`` are passed to the question's compute function and are part of
+    the key. Without a cache this is just the computation.
+    """
+    compute = QUESTIONS[number].compute
+    if cache is None:
+        return compute(df, **params)
+    key = question_key(number, fingerprint(df, QUESTIONS[number].columns,
+                                           digests), params)
+    result = cache.get(key, _MISSING)
+    if result is _MISSING:
+        result = compute(df, **params)
+        cache.put(key, result)
+    return result
+
+
+def question_batch(df, numbers, cache=None, digests=None):
+    """Results of questions ``numbers`` on ``df``, memoised in ``cache``.
+
+    The questions run with their default parameters; those not in the cache
+    are computed together in one Planner batch (see plan.plan_questions).
+    Returns a dict mapping each number to its result.
+    """
+    # Columns shared by several questions are fingerprinted once
+    digests = {} if digests is None else digests
+    keys = {}
+    results = {}
+    for number in numbers:
+        if cache is not None:
+            keys[number] = question_key(number, fingerprint(
+                df, QUESTIONS[number].columns, digests))
+            result = cache.get(keys[number], _MISSING)
+            if result is not _MISSING:
+                results[number] = result
+    missing = [number for number in numbers if number not in results]
+    if missing:
+        computed = plan_questions(df, missing)
+        for number in missing:
+            if cache is not None:
+                cache.put(keys[number], computed[number])
+            results[number] = computed[number]
+    return results
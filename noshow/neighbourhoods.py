@@ -0,0 +1,104 @@
+"""Dictionary-encoded Neighbourhood index with fast top-k queries.
+
+The notebook finds the neighbourhoods with the most no-shows with a boolean
+mask copy, a value_counts over strings and a full sort. NeighbourhoodIndex
+keeps the neighbourhood names once, as a dictionary, and a small array of
+(shows, no-shows) counts per dictionary code. A top-k query is an
+``np.argpartition`` over that array followed by a sort of the k winners, so
+it costs microseconds regardless of the number of appointments.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .contingency import encode
+
+TOP_BY = ('no_shows', 'shows', 'total', 'rate')
+
+
+class NeighbourhoodIndex(object):
+    """Show and no-show counts per neighbourhood, keyed by dictionary code."""
+
+    def __init__(self, labels=(), counts=None):
+        self.labels = np.asarray(labels, dtype=object)
+        if counts is None:
+            counts = np.zeros((len(self.labels), 2), np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_frame(cls, df, column='Neighbourhood', target='No_Show'):
+        return cls().update(df, column, target)
+
+    def update(self, df, column='Neighbourhood', target='No_Show'):
+        """Add the appointments of ``df`` to the counts.
+
+        Neighbourhoods not seen before get new codes at the end of the
+        dictionary; existing codes never change.
+        """
+        codes, levels = encode(df[column])
+        target_codes = pd.Categorical(df[target],
+                                      categories=['No', 'Yes']).codes
+        valid = (codes >= 0) & (target_codes >= 0)
+        counts = np.bincount(codes[valid].astype(np.int64) * 2
+                             + target_codes[valid],
+                             minlength=len(levels) * 2).reshape(-1, 2)
+        # Map the frame's codes onto this index's dictionary
+        new = [label for label in levels if label not in self._codes]
+        if new:
+            for label in new:
+                self._codes[label] = len(self._codes)
+            self.labels = np.append(self.labels, np.asarray(new, dtype=object))
+            self.counts = np.vstack([self.counts,
+                                     np.zeros((len(new), 2), np.int64)])
+        mapping = np.fromiter((self._codes[label] for label in levels),
+                              dtype=np.int64, count=len(levels))
+        np.add.at(self.counts, mapping, counts)
+        return self
+
+    def code(self, label):
+        """Dictionary code of a neighbourhood."""
+        return self._codes[label]
+
+    def values(self, by='no_shows', min_total=0):
+        """Per-code values of the ``by`` statistic (nan below ``min_total``)."""
+        if by not in TOP_BY:
+            raise ValueError('by must be one of {}'.format(TOP_BY))
+        shows, no_shows = self.counts[:, 0], self.counts[:, 1]
+        total = shows + no_shows
+        if by == 'rate':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = no_shows / total
+        else:
+            values = {'shows': shows, 'no_shows': no_shows,
+                      'total': total}[by].astype(float)
+        if min_total:
+            values = np.where(total >= min_total, values, np.nan)
+        return values
+
+    def top(self, k=10, by='no_shows', min_total=0):
+        """The ``k`` neighbourhoods with the highest ``by`` statistic.
+
+        ``by`` is 'no_shows' (Question 6), 'shows', 'total' or 'rate' (the
+        no-show rate); ``min_total`` leaves out neighbourhoods with fewer
+        appointments, which matters for rates. Returns a Series from the
+        neighbourhood names to the statistic, highest first.
+        """
+        values = self.values(by, min_total)
+        candidates = np.flatnonzero(~np.isnan(values))
+        k = min(k, len(candidates))
+        if k == 0:
+            return pd.Series([], dtype=float, name=by)
+        keys = values[candidates]
+        if k < len(candidates):
+            part = np.argpartition(-keys, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        # Highest first, ties broken by name
+        order = np.lexsort((self.labels[candidates[part]], -keys[part]))
+        chosen = candidates[part[order]]
+        result = values[chosen]
+        if by != 'rate':
+            result = result.astype(np.int64)
+        return pd.Series(result, index=pd.Index(self.labels[chosen],
+                                                name='Neighbourhood'), name=by)
@@ -0,0 +1,59 @@
+"""Chunked (out-of-core) execution of the cleaning rules and Questions 1-8.
+
+The in-memory path needs the whole cleaned frame. Here the CSV is streamed
+in chunks: each chunk is typed, gets its derived columns and goes through the
+cleaning rules (which only look at one row at a time), and is then folded
+into mergeable partial aggregates -- a ShowRateAggregator for the counts and
+moments -- before the next chunk is read. The question results are built
+from those aggregates and have the same structure and values as
+``QUESTIONS[n].compute(df)`` on the full frame (up to floating-point
+rounding of means and variances), while peak memory is bounded by the chunk
+size.
+"""
+
+import pandas as pd
+
+from .cleaning import RULES, add_derived_columns, apply_rules
+from .incremental import CLASSES, TARGET, ShowRateAggregator
+from .instrument import stage
+from .loader import DATA_FILE, iter_appointments
+from .questions import QUESTIONS, answer_from_counts
+
+
+def aggregate_csv(path=DATA_FILE, chunksize=1000000, rules=RULES):
+    """Stream, clean and aggregate a CSV export.
+
+    Returns the ShowRateAggregator and the cleaning report summed over all
+    the chunks.
+    """
+    aggregator = ShowRateAggregator()
+    report = None
+    for chunk in iter_appointments(path, chunksize):
+        chunk, chunk_report = apply_rules(add_derived_columns(chunk), rules)
+        with stage('aggregate', len(chunk)):
+            aggregator.update(chunk)
+        if report is None:
+            report = chunk_report
+        else:
+            report['rows'] += chunk_report['rows']
+    return aggregator, report
+
+
+def question_results(aggregator, numbers=None, method='log', n_bins=10,
+                     k=10):
+    """Results of Questions ``numbers`` (default all) from the aggregates."""
+    numbers = sorted(QUESTIONS) if numbers is None else list(numbers)
+    counts = dict(aggregator.counts)
+    counts[TARGET] = pd.Series(aggregator.moments['Age'].n, index=CLASSES)
+    results = {}
+    for number in numbers:
+        with stage('q{}'.format(number), aggregator.rows):
+            results[number] = answer_from_counts(
+                number, counts, aggregator.moments, method, n_bins, k)
+    return results
+
+
+def run_out_of_core(path=DATA_FILE, numbers=None, chunksize=1000000):
+    """Answer Questions ``numbers`` from a CSV of any size, chunk by chunk."""
+    aggregator, _ = aggregate_csv(path, chunksize)
+    return question_results(aggregator, numbers)
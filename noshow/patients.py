@@ -0,0 +1,161 @@
+"""Patient-level index for repeat-visit analysis.
+
+Step 5 of the notebook copies every repeated row (``df[df.Patient_Id.
+duplicated()]``) to find the patients with the most appointments. The
+PatientIndex sorts the appointments once by (Patient_Id, Appointment_Day,
+Scheduled_Day) -- O(n log n) -- and keeps the group offsets of every patient
+in that order. Per-appointment history features (previous visits, previous
+no-shows, days since the previous visit) then come from vectorised
+cumulative sums over the sorted arrays, and a patient's summary or rows are
+an O(1) lookup. Only appointments on an earlier Appointment_Day count as
+history, so every feature is known when the appointment is booked.
+"""
+
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ['Prior_Visits', 'Prior_No_Shows', 'Days_Since_Last_Visit']
+
+
+def _datetime_values(series, unit):
+    """Integer time of a (possibly tz-aware) datetime column in ``unit``."""
+    return series.values.astype('datetime64[{}]'.format(unit)).view(np.int64)
+
+
+class PatientIndex(object):
+    """Appointments grouped by patient, each group in appointment order.
+
+    ``order`` lists the row positions of the frame sorted by (Patient_Id,
+    Appointment_Day, Scheduled_Day); the rows of the i-th patient in
+    ``patient_ids`` are ``order[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, df):
+        ids = df['Patient_Id'].to_numpy()
+        scheduled = _datetime_values(df['Scheduled_Day'], 'ns')
+        day = _datetime_values(df['Appointment_Day'], 'D')
+        self.order = np.lexsort((scheduled, day, ids))
+        sorted_ids = ids[self.order]
+        day = day[self.order]
+        # A group (and a run) starts at the first row and at every change;
+        # [:n] leaves no start at all when there are no rows
+        n = len(ids)
+        new_patient = np.r_[True, sorted_ids[1:] != sorted_ids[:-1]][:n]
+        starts = np.flatnonzero(new_patient)
+        self.offsets = np.append(starts, n)
+        self.patient_ids = sorted_ids[starts]
+        self.visits = np.diff(self.offsets)
+        self.days = day
+
+        no_show = (df['No_Show'] == 'Yes').to_numpy()[self.order]
+        cumulative = np.r_[0, np.cumsum(no_show)]
+        self.no_shows = cumulative[self.offsets[1:]] - cumulative[starts]
+        self._cumulative = cumulative
+        self._low = int(day.min()) - 1 if len(day) else 0
+        self._span = int(day.max()) - self._low + 2 if len(day) else 2
+        self._keys = None
+
+        # History of a row = the rows of its patient before the first row of
+        # its (patient, Appointment_Day) run, so same-day appointments do not
+        # count each other
+        group_start = np.repeat(starts, self.visits)
+        new_run = new_patient | np.r_[True, day[1:] != day[:-1]][:n]
+        run_start = np.maximum.accumulate(np.where(new_run, np.arange(n), 0))
+        prior_visits = run_start - group_start
+        prior_no_shows = cumulative[run_start] - cumulative[group_start]
+        since_last = (day - day[np.maximum(run_start - 1, 0)]).astype(float)
+        since_last[prior_visits == 0] = np.nan
+
+        # Back to the frame's row order
+        history = np.empty((n, 3))
+        history[self.order, 0] = prior_visits
+        history[self.order, 1] = prior_no_shows
+        history[self.order, 2] = since_last
+        self._history = history
+        self._index = df.index
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.patient_ids)
+
+    def features(self):
+        """Per-appointment history, aligned with the frame's rows.
+
+        Prior_Visits and Prior_No_Shows count the patient's appointments on
+        an earlier Appointment_Day; Days_Since_Last_Visit is the number of
+        days since the latest of them (nan when there is none).
+        """
+        history = self._history
+        return pd.DataFrame({
+            'Prior_Visits': history[:, 0].astype(np.int32),
+            'Prior_No_Shows': history[:, 1].astype(np.int32),
+            'Days_Since_Last_Visit': history[:, 2].astype(np.float32),
+        }, index=self._index)
+
+    def _key(self, groups, days):
+        # (patient group, day) as one int64 that sorts like the index; days
+        # outside the indexed range are clipped to just below or above it
+        return groups * self._span + np.clip(days - self._low, 0,
+                                             self._span - 1)
+
+    def lookup(self, df):
+        """History features of new appointments from this (past) index.
+
+        ``df`` needs Patient_Id and Appointment_Day only -- no No_Show -- so
+        a day's bookings can be scored: each appointment gets the number of
+        its patient's indexed appointments on an earlier day, how many of
+        them were no-shows and the days since the latest. Returns a frame of
+        HISTORY_COLUMNS aligned with ``df``.
+        """
+        ids = df['Patient_Id'].to_numpy()
+        days = _datetime_values(df['Appointment_Day'], 'D')
+        groups = np.searchsorted(self.patient_ids, ids)
+        known = groups < len(self.patient_ids)
+        known[known] = self.patient_ids[groups[known]] == ids[known]
+        groups = np.where(known, groups, 0)
+        if self._keys is None:
+            self._keys = self._key(np.repeat(np.arange(len(self.visits)),
+                                             self.visits), self.days)
+        position = np.searchsorted(self._keys, self._key(groups, days))
+        start = self.offsets[groups]
+        prior_visits = np.where(known, position - start, 0)
+        prior_no_shows = np.where(known, self._cumulative[position]
+                                  - self._cumulative[start], 0)
+        last = self.days[np.maximum(position - 1, 0)] if len(self.days) \
+            else np.zeros(len(ids), dtype=np.int64)
+        since_last = np.where(prior_visits > 0, days - last, np.nan)
+        return pd.DataFrame({
+            'Prior_Visits': prior_visits.astype(np.int32),
+            'Prior_No_Shows': prior_no_shows.astype(np.int32),
+            'Days_Since_Last_Visit': since_last.astype(np.float32),
+        }, index=df.index)
+
+    def _position(self, patient_id):
+        if self._lookup is None:
+            self._lookup = {pid: i for i, pid in
+                            enumerate(self.patient_ids.tolist())}
+        return self._lookup[patient_id]
+
+    def rows(self, patient_id):
+        """Row positions of a patient's appointments, in appointment order."""
+        i = self._position(patient_id)
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    def summary(self, patient_id):
+        """Number of appointments and no-shows of a patient."""
+        i = self._position(patient_id)
+        return {'visits': int(self.visits[i]),
+                'no_shows': int(self.no_shows[i])}
+
+    def top_repeat(self, k=10):
+        """The ``k`` patients with the most appointments."""
+        k = min(k, len(self.visits))
+        if k == 0:
+            return pd.Series([], index=pd.Index([], dtype=np.int64,
+                                                 name='Patient_Id'),
+                             dtype=np.int64, name='visits')
+        part = np.argpartition(-self.visits, k - 1)[:k]
+        part = part[np.lexsort((self.patient_ids[part], -self.visits[part]))]
+        return pd.Series(self.visits[part],
+                         index=pd.Index(self.patient_ids[part],
+                                        name='Patient_Id'), name='visits')
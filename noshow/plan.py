@@ -0,0 +1,315 @@
+"""Lazy, planned group-by/filter/aggregate queries over the cleaned table.
+
+Every question of the notebook builds its own masks and copies
+(``shows``/``no_shows``, ``df[df.No_Show == 'No'].Age``, ...), so shared
+work is repeated. Here a question is declared as a Query -- filters, group
+keys and aggregations -- and nothing runs until a Planner executes a batch
+of queries together:
+
+* each distinct predicate is evaluated once, and each distinct set of
+  predicates is AND-ed once;
+* each key column is encoded to integer codes once, and each distinct
+  (filters, keys) grouping is turned into group codes once;
+* aggregations on the same grouping are fused: the group sizes come from one
+  bincount and every (column, sum / sum of squared deviations) needed by
+  any query is computed once; the squared deviations are taken from the
+  group means, as in stats.group_moments, so variances do not lose their
+  precision to cancellation.
+
+Adding a query that reuses existing filters, groupings and columns therefore
+costs close to nothing. ``Planner.explain()`` lists the passes, and
+plan_questions answers Questions 1-8 from one batch of QUESTION_QUERIES.
+
+    q6 = Query().where('No_Show', '==', 'Yes').groupby('Neighbourhood') \\
+                .agg(no_shows=('*', 'count'))
+    Planner({'q6': q6}).execute(df)['q6']
+"""
+
+import operator
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .contingency import encode
+from .instrument import stage
+from .questions import QUESTIONS, answer_from_counts
+from .stats import Moments
+
+OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+             '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+             'in': lambda values, options: np.isin(values, list(options))}
+AGGREGATIONS = ('count', 'sum', 'mean', 'var')
+
+Predicate = namedtuple('Predicate', ['column', 'op', 'value'])
+
+
+class Query(namedtuple('Query', ['filters', 'keys', 'aggs'])):
+    """An immutable filter -> group by -> aggregate description.
+
+    ``filters`` is a frozenset of Predicates (AND-ed), ``keys`` a tuple of
+    column names and ``aggs`` a tuple of (output name, column, function)
+    with function in AGGREGATIONS ('count' ignores its column; use '*').
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, filters=frozenset(), keys=(), aggs=()):
+        return super(Query, cls).__new__(cls, frozenset(filters), tuple(keys),
+                                         tuple(aggs))
+
+    def where(self, column, op, value):
+        if op not in OPERATORS:
+            raise ValueError('op must be one of {}'.format(sorted(OPERATORS)))
+        if op == 'in':
+            value = tuple(value)
+        return self._replace(filters=self.filters
+                             | {Predicate(column, op, value)})
+
+    def groupby(self, *keys):
+        return self._replace(keys=self.keys + keys)
+
+    def agg(self, **aggs):
+        """Add aggregations, e.g. ``mean_age=('Age', 'mean')``."""
+        new = []
+        for name, (column, func) in aggs.items():
+            if func not in AGGREGATIONS:
+                raise ValueError('function must be one of {}'
+                                 .format(AGGREGATIONS))
+            new.append((name, column, func))
+        return self._replace(aggs=self.aggs + tuple(new))
+
+    @property
+    def columns(self):
+        """Columns of the table the query reads."""
+        used = {p.column for p in self.filters} | set(self.keys)
+        used |= {column for _, column, func in self.aggs if func != 'count'}
+        return used
+
+
+class Planner(object):
+    """Runs a batch of named Queries with shared, fused passes."""
+
+    def __init__(self, queries):
+        self.queries = dict(queries)
+
+    @property
+    def columns(self):
+        """Every column any query reads (the only ones that are scanned)."""
+        used = set()
+        for query in self.queries.values():
+            used |= query.columns
+        return sorted(used)
+
+    def _passes(self):
+        predicates = set()
+        filter_sets = set()
+        groupings = {}
+        for query in self.queries.values():
+            predicates |= query.filters
+            if len(query.filters) > 1:
+                filter_sets.add(query.filters)
+            grouping = (query.filters, query.keys)
+            needed = groupings.setdefault(grouping, set())
+            for _, column, func in query.aggs:
+                if func in ('sum', 'mean', 'var'):
+                    needed.add((column, 1))
+                if func == 'var':
+                    needed.add((column, 2))
+        keys = {key for _, group_keys in groupings for key in group_keys}
+        return predicates, filter_sets, keys, groupings
+
+    def explain(self):
+        """Human-readable list of the passes the batch will make."""
+        predicates, filter_sets, keys, groupings = self._passes()
+        lines = ['scan columns: {}'.format(', '.join(self.columns))]
+        lines += ['mask: {} {} {!r}'.format(*p) for p in sorted(predicates)]
+        lines += ['and: {}'.format(' & '.join(
+            '{} {} {!r}'.format(*p) for p in sorted(f))) for f in filter_sets]
+        lines += ['encode: {}'.format(key) for key in sorted(keys)]
+        for (filters, group_keys), sums in groupings.items():
+            lines.append('group by ({}){}: count{}'.format(
+                ', '.join(group_keys),
+                ' where {} filters'.format(len(filters)) if filters else '',
+                ''.join((', sum(({} - mean)^2)' if power == 2
+                         else ', sum({})').format(c)
+                        for c, power in sorted(sums))))
+        lines.append('{} queries'.format(len(self.queries)))
+        return '\n'.join(lines)
+
+    def execute(self, df):
+        """Run every query on ``df``; returns a dict of DataFrames."""
+        with stage('plan', len(df)):
+            return self._execute(df)
+
+    def _execute(self, df):
+        predicates, filter_sets, keys, groupings = self._passes()
+        masks = {p: np.asarray(OPERATORS[p.op](df[p.column].to_numpy(),
+                                               p.value), dtype=bool)
+                 for p in predicates}
+        combined = {}
+        for filters in filter_sets:
+            mask = np.ones(len(df), dtype=bool)
+            for p in filters:
+                mask &= masks[p]
+            combined[filters] = mask
+        encoded = {}
+        complete = {}
+        for key in keys:
+            codes, levels = encode(df[key])
+            if isinstance(df[key].dtype, pd.CategoricalDtype):
+                levels = pd.Categorical(levels, dtype=df[key].dtype)
+            encoded[key] = (codes, levels)
+            complete[key] = bool((codes >= 0).all())
+        values = {}
+
+        fused = {}
+        for (filters, group_keys), sums in groupings.items():
+            shape = tuple(len(encoded[key][1]) for key in group_keys)
+            # Rows with a missing key or failing a filter are left out; the
+            # mask is only built when some row is
+            valid = None
+            group = np.zeros(len(df), dtype=np.int64)
+            for key, n_levels in zip(group_keys, shape):
+                codes = encoded[key][0]
+                group *= n_levels
+                group += codes
+                if not complete[key]:
+                    valid = codes >= 0 if valid is None \
+                        else valid & (codes >= 0)
+            if filters:
+                mask = masks[next(iter(filters))] if len(filters) == 1 \
+                    else combined[filters]
+                valid = mask if valid is None else valid & mask
+            if valid is not None:
+                group = group[valid]
+            size = int(np.prod(shape))
+            result = {'count': np.bincount(group, minlength=size)}
+            # Sums before squared deviations, which need the group means
+            for column, power in sorted(sums, key=lambda s: s[1]):
+                if column not in values:
+                    values[column] = df[column].to_numpy(dtype=float)
+                weights = values[column]
+                if valid is not None:
+                    weights = weights[valid]
+                if power == 2:
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        mean = result[(column, 1)] / result['count']
+                    weights = weights - mean[group]
+                    weights = weights * weights
+                result[(column, power)] = np.bincount(group, weights, size)
+            fused[(filters, group_keys)] = (shape, result)
+
+        return {name: self._frame(query, encoded, *fused[(query.filters,
+                                                          query.keys)])
+                for name, query in self.queries.items()}
+
+    @staticmethod
+    def _frame(query, encoded, shape, sums):
+        count = sums['count']
+        present = np.flatnonzero(count)
+        if query.keys:
+            positions = np.unravel_index(present, shape)
+            arrays = [encoded[key][1][pos] for key, pos in zip(query.keys,
+                                                               positions)]
+            if len(arrays) == 1:
+                index = pd.Index(arrays[0], name=query.keys[0])
+            else:
+                index = pd.MultiIndex.from_arrays(arrays, names=query.keys)
+        else:
+            present = np.array([0])
+            index = pd.RangeIndex(1)
+        n = count[present].astype(float)
+        columns = {}
+        for name, column, func in query.aggs:
+            if func == 'count':
+                columns[name] = count[present]
+                continue
+            total = sums[(column, 1)][present]
+            if func == 'sum':
+                columns[name] = total
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = total / n
+                if func == 'mean':
+                    columns[name] = mean
+                else:
+                    columns[name] = sums[(column, 2)][present] / (n - 1)
+        return pd.DataFrame(columns, index=index)
+
+
+def _counts(*keys):
+    return Query().groupby(*keys).agg(count=('*', 'count'))
+
+
+# Questions 1-8 declared as queries (named 'q<number>_...'); many share
+# groupings and columns
+QUESTION_QUERIES = {
+    'q1_status': _counts('No_Show'),
+    'q2_age': _counts('Age', 'No_Show'),
+    'q2_age_moments': Query().groupby('No_Show').agg(
+        n=('*', 'count'), mean=('Age', 'mean'), var=('Age', 'var')),
+    'q3_gender': _counts('Gender', 'No_Show'),
+    'q4_scholarship': _counts('Scholarship', 'No_Show'),
+    'q5_hipertension': _counts('Hipertension', 'No_Show'),
+    'q5_diabetes': _counts('Diabetes', 'No_Show'),
+    'q5_alcoholism': _counts('Alcoholism', 'No_Show'),
+    'q5_handcap': _counts('Handcap', 'No_Show'),
+    'q5_sms_received': _counts('SMS_received', 'No_Show'),
+    'q6_neighbourhoods': _counts('Neighbourhood', 'No_Show'),
+    'q7_weekday': _counts('Appointment_Weekday', 'No_Show'),
+    'q8_waiting_days': _counts('Waiting_Days', 'No_Show'),
+    'q8_waiting_moments': Query().groupby('No_Show').agg(
+        n=('*', 'count'), mean=('Waiting_Days', 'mean'),
+        var=('Waiting_Days', 'var')),
+}
+
+_CLASSES = pd.Index(['No', 'Yes'], name='No_Show')
+
+
+def plan_questions(df, numbers=None, method='log', n_bins=10, k=10):
+    """Results of Questions ``numbers`` (default all) from one Planner batch.
+
+    The queries of all the questions run together, and their count tables
+    and moments are turned into results by questions.answer_from_counts,
+    so they are the same as ``QUESTIONS[n].compute(df)`` (up to
+    floating-point rounding of means and variances).
+    """
+    numbers = sorted(QUESTIONS) if numbers is None else list(numbers)
+    unknown = set(numbers) - set(QUESTIONS)
+    if unknown:
+        raise ValueError('unknown questions: {}'.format(sorted(unknown)))
+    prefixes = tuple('q{}_'.format(number) for number in numbers)
+    queries = {name: query for name, query in QUESTION_QUERIES.items()
+               if name.startswith(prefixes)}
+    frames = Planner(queries).execute(df)
+    counts, moments = {}, {}
+    for name, frame in frames.items():
+        query = queries[name]
+        if query.keys == ('No_Show',) and 'mean' in frame:
+            column = next(column for _, column, func in query.aggs
+                          if func == 'mean')
+            moments[column] = _moments(frame)
+        elif query.keys == ('No_Show',):
+            counts['No_Show'] = frame['count']
+        else:
+            counts[query.keys[0]] = _table(frame)
+    return {number: answer_from_counts(number, counts, moments, method,
+                                       n_bins, k)
+            for number in numbers}
+
+
+def _table(frame):
+    """(key, No_Show) counts of a planned frame as a key x class table."""
+    counts = frame['count'].unstack('No_Show', fill_value=0)
+    counts.index = pd.Index(np.asarray(counts.index), name=counts.index.name)
+    counts.columns = pd.Index(np.asarray(counts.columns), name='No_Show')
+    return counts.reindex(columns=_CLASSES, fill_value=0)
+
+
+def _moments(frame):
+    """Moments per class of a planned (n, mean, var) frame."""
+    frame = frame.reindex(_CLASSES)
+    n = frame['n'].fillna(0).to_numpy(dtype=np.int64)
+    m2 = np.where(n > 1, frame['var'].to_numpy() * (n - 1), 0.0)
+    return Moments(n, frame['mean'].fillna(0).to_numpy(), m2)
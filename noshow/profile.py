@@ -0,0 +1,78 @@
+"""Column profile of the appointments frame (min, max, counts).
+
+The notebook sorts the whole frame four times to print the first and last
+Scheduled_Day and Appointment_Day. A profile needs a single linear reduction
+per column instead, and for a Parquet cache it can be read from the row-group
+statistics without loading any data at all.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+PROFILE_COLUMNS = ['dtype', 'count', 'nulls', 'min', 'max']
+
+
+def _has_order(series):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.ordered
+    return dtype != object
+
+
+def profile_frame(df):
+    """Per-column dtype, non-null count, null count, min and max.
+
+    Min and max are left empty for unordered categorical and object columns.
+    The first and last dates of the notebook are::
+
+        profile_frame(df).loc[['Scheduled_Day', 'Appointment_Day'], ['min', 'max']]
+    """
+    rows = []
+    for col in df.columns:
+        series = df[col]
+        count = int(series.count())
+        low = high = None
+        if count and _has_order(series):
+            low, high = series.min(), series.max()
+        rows.append((col, str(series.dtype), count, len(series) - count,
+                     low, high))
+    return pd.DataFrame(rows, columns=['column'] + PROFILE_COLUMNS).set_index('column')
+
+
+def profile_parquet(path):
+    """Profile a Parquet file from its row-group statistics only.
+
+    Columns whose statistics are missing (or dictionary-encoded strings)
+    get empty min/max. Needs pyarrow.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    meta = parquet.metadata
+    schema = parquet.schema_arrow
+    rows = []
+    for i, field in enumerate(schema):
+        if field.name == '__index_level_0__':
+            continue
+        nulls, low, high = 0, None, None
+        complete = True
+        for g in range(meta.num_row_groups):
+            stats = meta.row_group(g).column(i).statistics
+            if stats is None or not stats.has_null_count:
+                complete = False
+                break
+            nulls += stats.null_count
+            if not stats.has_min_max:
+                complete = False
+                continue
+            low = stats.min if low is None else min(low, stats.min)
+            high = stats.max if high is None else max(high, stats.max)
+        if not complete or isinstance(low, (bytes, str)):
+            low = high = None
+        if isinstance(low, datetime):
+            low, high = pd.Timestamp(low), pd.Timestamp(high)
+        count = meta.num_rows - nulls if complete else None
+        rows.append((field.name, str(field.type), count,
+                     nulls if complete else None, low, high))
+    return pd.DataFrame(rows, columns=['column'] + PROFILE_COLUMNS).set_index('column')
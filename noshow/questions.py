@@ -0,0 +1,132 @@
+"""The eight questions of the analysis as independent computations.
+
+Each Question names the columns of the cleaned frame it reads and a
+``compute`` function returning its tables and statistics (no figures), so
+questions can run in any order, in separate processes, or on a frame that
+holds only their own columns. answer_from_counts gives the same results from
+count tables and moments aggregated elsewhere (out of core, or by the
+Planner).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .binning import bin_edges, binned_contingency, rebin
+from .contingency import Contingency, contingency_tables
+from .neighbourhoods import NeighbourhoodIndex
+from .stats import chi2_test, ttest_by_class, ttest_moments
+
+Question = namedtuple('Question', ['number', 'title', 'columns', 'compute'])
+
+HEALTH = ['Hipertension', 'Diabetes', 'Alcoholism', 'Handcap', 'SMS_received']
+
+
+def show_status(df):
+    counts = df['No_Show'].value_counts().reindex(['No', 'Yes'], fill_value=0)
+    return {'counts': counts, 'proportions': counts / counts.sum()}
+
+
+def age(df):
+    return {'age': contingency_tables(df, ['Age'])['Age'],
+            'mean_age': df.groupby('No_Show', observed=True)['Age'].mean(),
+            'ttest': ttest_by_class(df, 'Age')}
+
+
+def gender(df):
+    return {'gender': contingency_tables(df, ['Gender'])['Gender']}
+
+
+def scholarship(df):
+    return {'scholarship': contingency_tables(df, ['Scholarship'])
+            ['Scholarship']}
+
+
+def health(df):
+    return {'tables': contingency_tables(df, HEALTH)}
+
+
+def neighbourhoods(df, k=10):
+    return {'top': NeighbourhoodIndex.from_frame(df).top(k)}
+
+
+def weekday(df):
+    return {'weekday': contingency_tables(df, ['Appointment_Weekday'])
+            ['Appointment_Weekday']}
+
+
+def waiting_days(df, method='log', n_bins=10):
+    # Binned, so the table has the same size however long the history is
+    return {'waiting_days': binned_contingency(df, 'Waiting_Days',
+                                               method=method, n_bins=n_bins),
+            'ttest': ttest_by_class(df, 'Waiting_Days')}
+
+
+QUESTIONS = {q.number: q for q in [
+    Question(1, 'Proportion of shows and no-shows', ['No_Show'], show_status),
+    Question(2, 'Age distribution of shows vs no-shows', ['Age', 'No_Show'],
+             age),
+    Question(3, 'Gender vs appointment status', ['Gender', 'No_Show'], gender),
+    Question(4, 'Scholarship vs appointment status',
+             ['Scholarship', 'No_Show'], scholarship),
+    Question(5, 'Health designation vs appointment status',
+             HEALTH + ['No_Show'], health),
+    Question(6, 'Top 10 neighbourhoods with the most no-shows',
+             ['Neighbourhood', 'No_Show'], neighbourhoods),
+    Question(7, 'Appointment weekday vs appointment status',
+             ['Appointment_Weekday', 'No_Show'], weekday),
+    Question(8, 'Waiting days vs appointment status',
+             ['Waiting_Days', 'No_Show'], waiting_days),
+]}
+
+
+def _contingency(counts):
+    test = chi2_test(counts.to_numpy())
+    return Contingency(counts, test.chi2, test.p, test.dof)
+
+
+def answer_from_counts(number, counts, moments, method='log', n_bins=10,
+                       k=10):
+    """Result of question ``number`` from aggregated counts and moments.
+
+    ``counts`` maps No_Show to the number of rows per class (a Series
+    indexed No, Yes) and every other column the question reads to its count
+    table (one row per level seen, columns No and Yes); ``moments`` maps Age
+    and Waiting_Days to their Moments per class. The result is the same as
+    ``QUESTIONS[number].compute`` with these parameters, up to the rounding
+    of means and variances.
+    """
+    if number == 1:
+        classes = counts['No_Show'].reindex(['No', 'Yes'], fill_value=0)
+        classes = pd.Series(classes.to_numpy(dtype=np.int64),
+                            index=pd.Index(['No', 'Yes'], name='No_Show'),
+                            name='count')
+        return {'counts': classes, 'proportions': classes / classes.sum()}
+    if number == 2:
+        age = moments['Age']
+        return {'age': _contingency(counts['Age']),
+                'mean_age': pd.Series(age.mean, name='Age',
+                                      index=pd.CategoricalIndex(
+                                          ['No', 'Yes'], name='No_Show')),
+                'ttest': ttest_moments(age.group(0), age.group(1))}
+    if number == 3:
+        return {'gender': _contingency(counts['Gender'])}
+    if number == 4:
+        return {'scholarship': _contingency(counts['Scholarship'])}
+    if number == 5:
+        return {'tables': {var: _contingency(counts[var]) for var in HEALTH}}
+    if number == 6:
+        table = counts['Neighbourhood']
+        index = NeighbourhoodIndex(table.index, table.to_numpy())
+        return {'top': index.top(k)}
+    if number == 7:
+        return {'weekday': _contingency(counts['Appointment_Weekday'])}
+    if number == 8:
+        table = counts['Waiting_Days']
+        edges = bin_edges(table.index.to_numpy(), method, n_bins,
+                          weights=table.sum(axis=1).to_numpy())
+        waiting = moments['Waiting_Days']
+        return {'waiting_days': rebin(table, edges),
+                'ttest': ttest_moments(waiting.group(0), waiting.group(1))}
+    raise ValueError('unknown question: {}'.format(number))
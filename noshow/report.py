@@ -0,0 +1,212 @@
+"""Headless rendering of the figures of the analysis.
+
+Each question's results are turned into a short list of Chart specs that hold
+only pre-aggregated data (proportions, counts per level), so drawing never
+touches the appointment rows. A Renderer keeps one Agg Figure per kind of
+chart and reuses it for every chart of that kind -- the axes are cleared, not
+rebuilt -- and writes every chart in each of the requested formats. Nothing
+goes through pyplot, so regenerating the report many times in one process
+does not accumulate figures, and the legends get their labels when they are
+drawn instead of being patched afterwards.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+STATUS_COLORS = ['palegreen', 'pink']
+STATUS_LABELS = ['Showed up', 'No Showed up']
+HOOD_COLORS = ['darkred', 'firebrick', 'indianred', 'palevioletred',
+               'lightcoral', 'salmon', 'darksalmon', 'lightsalmon',
+               'darkorange', 'orange']
+
+# kind: 'pie', 'stacked' (row proportions), 'lines' or 'bars' (counts per
+# level), or 'grid' (a dict of row-proportion tables, one panel each).
+Chart = namedtuple('Chart', ['name', 'kind', 'data', 'options'])
+
+GRID_SHAPE = (2, 3)
+
+
+def charts(number, result):
+    """The charts of question ``number``, given its computed ``result``."""
+    if number == 1:
+        proportions = result['proportions']
+        return [Chart('q1_show_status', 'pie',
+                      proportions.reindex(['Yes', 'No']),
+                      dict(labels=['Not Showed up', 'Showed up'],
+                           colors=['pink', 'palegreen'], explode=(0.1, 0),
+                           title='Show status of the Appointments',
+                           figsize=(6, 6)))]
+    if number == 2:
+        return [Chart('q2_age', 'stacked', result['age'].proportions,
+                      dict(xlabel='Age', title='Age vs Appointment status',
+                           figsize=(10, 5)))]
+    if number == 3:
+        return [Chart('q3_gender', 'stacked', result['gender'].proportions,
+                      dict(xlabel='Gender', title='Gender vs Appointment status',
+                           figsize=(7, 5)))]
+    if number == 4:
+        return [Chart('q4_scholarship', 'stacked',
+                      result['scholarship'].proportions,
+                      dict(xlabel='Scholarship',
+                           title='Scholarship vs Appointment status',
+                           figsize=(7, 5)))]
+    if number == 5:
+        return [Chart('q5_health', 'grid',
+                      {var: table.proportions
+                       for var, table in result['tables'].items()},
+                      dict(figsize=(14, 10)))]
+    if number == 6:
+        top = result['top']
+        return [Chart('q6_neighbourhoods', 'pie', top,
+                      dict(labels=list(top.index),
+                           colors=HOOD_COLORS[:len(top)], explode=None,
+                           title='Top {} "No-Show Appointments" '
+                                 'neighbourhoods'.format(len(top)),
+                           figsize=(8, 8)))]
+    if number == 7:
+        table = result['weekday']
+        return [Chart('q7_weekday_counts', 'lines', table.counts,
+                      dict(xlabel='Weekdays', title='Days vs Appointment status',
+                           figsize=(7, 5))),
+                Chart('q7_weekday', 'stacked', table.proportions,
+                      dict(xlabel='Weekdays',
+                           title='Appointment Weekday vs Appointment Status',
+                           figsize=(7, 5)))]
+    if number == 8:
+        table = result['waiting_days']
+        return [Chart('q8_waiting_days', 'bars', table.counts,
+                      dict(xlabel='Waiting Days',
+                           title='Waiting Days vs Appointment Status',
+                           figsize=(12, 6))),
+                Chart('q8_waiting_days_rate', 'stacked', table.proportions,
+                      dict(xlabel='Waiting Days',
+                           title='Waiting Days vs Appointment Status',
+                           figsize=(12, 6)))]
+    raise ValueError('unknown question: {}'.format(number))
+
+
+def _draw_pie(ax, data, options):
+    ax.pie(np.asarray(data, dtype=float), explode=options['explode'],
+           labels=options['labels'], colors=options['colors'],
+           autopct='%1.1f%%', shadow=True, startangle=90)
+    ax.set_title(options['title'])
+    ax.axis('equal')
+
+
+def _draw_stacked(ax, proportions, xlabel, title):
+    x = np.arange(len(proportions))
+    shows = proportions.iloc[:, 0].to_numpy()
+    no_shows = proportions.iloc[:, 1].to_numpy()
+    ax.bar(x, shows, 0.5, color=STATUS_COLORS[0], label=STATUS_LABELS[0])
+    ax.bar(x, no_shows, 0.5, bottom=shows, color=STATUS_COLORS[1],
+           label=STATUS_LABELS[1])
+    ax.set_xticks(x)
+    ax.set_xticklabels([str(level) for level in proportions.index], rotation=90)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Show vs. No Show proportion')
+    ax.set_title(title)
+    ax.legend(fancybox=True, framealpha=0.5)
+
+
+def _draw_counts(ax, counts, options, kind):
+    x = np.arange(len(counts))
+    for i in range(2):
+        if kind == 'lines':
+            ax.plot(x, counts.iloc[:, i].to_numpy(), color=STATUS_COLORS[i],
+                    linewidth=3.0, label=STATUS_LABELS[i])
+        else:
+            ax.bar(x + (i - 0.5) * 0.4, counts.iloc[:, i].to_numpy(), 0.4,
+                   color=STATUS_COLORS[i], label=STATUS_LABELS[i])
+    ax.set_xticks(x)
+    ax.set_xticklabels([str(level) for level in counts.index],
+                       rotation=0 if kind == 'lines' else 90)
+    ax.grid(kind == 'lines')
+    ax.set_xlabel(options['xlabel'])
+    ax.set_ylabel('Number of Appointments')
+    ax.set_title(options['title'])
+    ax.legend(fancybox=True, framealpha=0.9)
+
+
+class Renderer(object):
+    """Draws Charts on reusable Agg figures, one figure per kind of chart."""
+
+    def __init__(self, dpi=100):
+        self.dpi = dpi
+        self._templates = {}
+
+    def _template(self, kind):
+        if kind not in self._templates:
+            fig = Figure(dpi=self.dpi)
+            FigureCanvasAgg(fig)
+            if kind == 'grid':
+                axes = fig.subplots(*GRID_SHAPE).ravel()
+            else:
+                axes = [fig.add_subplot()]
+            self._templates[kind] = (fig, list(axes))
+        return self._templates[kind]
+
+    def draw(self, chart):
+        """Draw ``chart`` on its template figure and return the figure."""
+        fig, axes = self._template(chart.kind)
+        fig.set_size_inches(chart.options['figsize'])
+        for ax in axes:
+            ax.clear()
+            ax.set_visible(True)
+        if chart.kind == 'pie':
+            _draw_pie(axes[0], chart.data, chart.options)
+        elif chart.kind == 'stacked':
+            _draw_stacked(axes[0], chart.data, chart.options['xlabel'],
+                          chart.options['title'])
+        elif chart.kind in ('lines', 'bars'):
+            _draw_counts(axes[0], chart.data, chart.options, chart.kind)
+        elif chart.kind == 'grid':
+            if len(chart.data) > len(axes):
+                raise ValueError('at most {} panels per grid'.format(len(axes)))
+            for ax, (var, proportions) in zip(axes, chart.data.items()):
+                _draw_stacked(ax, proportions, var, var + ' vs No_Show')
+            for ax in axes[len(chart.data):]:
+                ax.set_visible(False)
+        else:
+            raise ValueError('unknown chart kind: {}'.format(chart.kind))
+        return fig
+
+    def save(self, chart, output_dir, formats=('png',)):
+        """Draw ``chart`` and write it once per format; returns the paths."""
+        fig = self.draw(chart)
+        paths = []
+        for fmt in formats:
+            path = os.path.join(output_dir, '{}.{}'.format(chart.name, fmt))
+            fig.savefig(path, format=fmt, bbox_inches='tight')
+            paths.append(path)
+        return paths
+
+
+_renderer = None
+
+
+def render(number, result, output_dir, formats=('png',)):
+    """Save the charts of one question with this process's Renderer."""
+    global _renderer
+    if _renderer is None:
+        _renderer = Renderer()
+    paths = []
+    for chart in charts(number, result):
+        paths.extend(_renderer.save(chart, output_dir, formats))
+    return paths
+
+
+def render_report(results, output_dir, formats=('png',)):
+    """Save the charts of several questions in one batch.
+
+    ``results`` maps question numbers to their computed results. Returns the
+    paths written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for number in sorted(results):
+        paths.extend(render(number, results[number], output_dir, formats))
+    return paths
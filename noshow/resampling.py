@@ -0,0 +1,302 @@
+"""Permutation tests and bootstrap confidence intervals on the count tables.
+
+The conclusions rest on asymptotic chi-square and t-test p-values, some of
+them from tiny cells (Handcap 2-4, Saturday appointments) where the notebook
+itself calls the proportions unstable. Resampling avoids the asymptotics,
+and because every question reduces to a count table -- levels of a variable
+x No_Show, or the distinct values of Age / Waiting_Days x No_Show -- the
+resamples are drawn as whole tables instead of shuffling rows:
+
+* a permutation of the No_Show labels is a random table with the same row
+  and column totals, drawn with one vectorised hypergeometric draw per cell
+  for a whole batch of resamples;
+* a bootstrap sample of the rows is a multinomial draw over the cells (or
+  over each column's cells, for a bootstrap stratified by No_Show).
+
+The statistics (chi-square, per-level no-show rates, difference of class
+means) are then computed on the ``(batch, rows, cols)`` stack at once.
+Resamples are made in batches of BATCH_SIZE, each with its own seed spawned
+from the caller's seed, so the results are the same whatever the number of
+worker processes the batches are spread over.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .binning import binned_contingency
+from .contingency import CATEGORICAL, contingency_tables, count_table, encode
+from .instrument import stage
+from .stats import as_counts, chi2_statistic
+
+BATCH_SIZE = 1000
+KINDS = ('permutation', 'bootstrap')
+
+PermutationResult = namedtuple('PermutationResult',
+                               ['statistic', 'p', 'n_resamples'])
+BootstrapResult = namedtuple('BootstrapResult',
+                             ['estimate', 'ci_low', 'ci_high', 'n_resamples'])
+
+
+def permutation_tables(counts, size, rng):
+    """``size`` random tables with the row and column totals of ``counts``.
+
+    Each is the table of a random permutation of the column labels over the
+    rows: cell by cell, the count is hypergeometric given what the earlier
+    cells have used up.
+    """
+    counts = as_counts(counts)
+    n_rows, n_cols = counts.shape
+    rows = counts.sum(axis=1)
+    remaining = np.tile(counts.sum(axis=0), (size, 1))
+    tables = np.empty((size, n_rows, n_cols), dtype=np.int64)
+    for i in range(n_rows - 1):
+        need = np.full(size, rows[i])
+        for j in range(n_cols - 1):
+            others = remaining[:, j + 1:].sum(axis=1)
+            drawn = rng.hypergeometric(remaining[:, j], others, need)
+            tables[:, i, j] = drawn
+            remaining[:, j] -= drawn
+            need -= drawn
+        tables[:, i, -1] = need
+        remaining[:, -1] -= need
+    tables[:, -1] = remaining
+    return tables
+
+
+def bootstrap_tables(counts, size, rng, stratified=False):
+    """``size`` bootstrap tables of ``counts`` (multinomial over the cells).
+
+    With ``stratified`` each column keeps its total, i.e. the rows of each
+    No_Show class are resampled separately.
+    """
+    counts = as_counts(counts)
+    if not stratified:
+        total = counts.sum()
+        draws = rng.multinomial(total, counts.ravel() / total, size)
+        return draws.reshape((size,) + counts.shape)
+    tables = np.empty((size,) + counts.shape, dtype=np.int64)
+    for j, column in enumerate(counts.T):
+        tables[:, :, j] = rng.multinomial(column.sum(),
+                                          column / column.sum(), size)
+    return tables
+
+
+def chi2_statistics(tables):
+    """Pearson's chi-square of every table of a stack."""
+    return chi2_statistic(tables)[0]
+
+
+def no_show_rates(tables):
+    """Share of the last column (No_Show == 'Yes') in every row."""
+    tables = np.asarray(tables, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return tables[..., -1] / tables.sum(axis=-1)
+
+
+def mean_difference(tables, values):
+    """Mean of ``values`` in the first column minus the mean in the last.
+
+    ``tables`` count how often each of ``values`` (the rows) occurs in each
+    class, so for Age this is the mean age of shows minus no-shows.
+    """
+    tables = np.asarray(tables, dtype=float)
+    totals = tables.sum(axis=-2)
+    means = (np.asarray(values, dtype=float)[:, np.newaxis]
+             * tables).sum(axis=-2) / totals
+    return means[..., 0] - means[..., -1]
+
+
+def _batch(kind, counts, statistic, size, seed, stratified):
+    rng = np.random.default_rng(seed)
+    if kind == 'permutation':
+        tables = permutation_tables(counts, size, rng)
+    else:
+        tables = bootstrap_tables(counts, size, rng, stratified)
+    return statistic(tables)
+
+
+def _jobs(kind, counts, statistic, n_resamples, seed, stratified=False):
+    if kind not in KINDS:
+        raise ValueError('kind must be one of {}'.format(KINDS))
+    sizes = [min(BATCH_SIZE, n_resamples - start)
+             for start in range(0, n_resamples, BATCH_SIZE)]
+    seeds = seed.spawn(len(sizes))
+    return [(kind, as_counts(counts), statistic, size, child, stratified)
+            for size, child in zip(sizes, seeds)]
+
+
+def _run_jobs(jobs, workers=1):
+    """Run batches in this process (``workers=1``) or on a process pool."""
+    if workers == 1 or len(jobs) <= 1:
+        return [_batch(*job) for job in jobs]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_batch, *zip(*jobs)))
+
+
+def resample(counts, statistic, kind='permutation', n_resamples=10000,
+             seed=0, workers=1, stratified=False):
+    """``statistic`` of ``n_resamples`` resampled tables of ``counts``.
+
+    ``statistic`` maps a ``(batch, rows, cols)`` stack to one value (or
+    array) per table and must be picklable when ``workers != 1``. Returns
+    the statistics of all resamples stacked along the first axis.
+    """
+    jobs = _jobs(kind, counts, statistic, n_resamples,
+                 np.random.SeedSequence(seed), stratified)
+    return np.concatenate(_run_jobs(jobs, workers))
+
+
+def permutation_p(observed, resampled, two_sided=False):
+    """Permutation p-value, counting the observed table as one resample."""
+    resampled = np.asarray(resampled)
+    if two_sided:
+        observed, resampled = np.abs(observed), np.abs(resampled)
+    # Tolerance so resamples equal to the observed value are not lost to
+    # rounding
+    extreme = resampled >= observed - 1e-9 * np.abs(observed)
+    return (1 + extreme.sum(axis=0)) / (len(resampled) + 1)
+
+
+def interval(estimate, resampled, alpha=0.05):
+    """Percentile bootstrap interval, ignoring resamples where it is nan."""
+    with np.errstate(invalid='ignore'):
+        low, high = np.nanquantile(resampled, [alpha / 2, 1 - alpha / 2],
+                                   axis=0)
+    return BootstrapResult(estimate, low, high, len(resampled))
+
+
+def permutation_chi2(counts, n_resamples=10000, seed=0, workers=1):
+    """Permutation test of independence of a count table (Pearson's chi2)."""
+    observed = chi2_statistics(as_counts(counts)[np.newaxis])[0]
+    resampled = resample(counts, chi2_statistics, 'permutation', n_resamples,
+                         seed, workers)
+    return PermutationResult(observed, permutation_p(observed, resampled),
+                             n_resamples)
+
+
+def bootstrap_rates(counts, n_resamples=10000, seed=0, workers=1, alpha=0.05):
+    """No-show rate of every row of ``counts`` with bootstrap intervals.
+
+    Returns a DataFrame (indexed like ``counts`` when it is one) with the
+    rate, its ``1 - alpha`` percentile interval and the row's size.
+    """
+    rates = no_show_rates(as_counts(counts))
+    resampled = resample(counts, no_show_rates, 'bootstrap', n_resamples,
+                         seed, workers)
+    return _rates_frame(counts, interval(rates, resampled, alpha))
+
+
+def _rates_frame(counts, result):
+    return pd.DataFrame({'rate': result.estimate, 'ci_low': result.ci_low,
+                         'ci_high': result.ci_high,
+                         'n': as_counts(counts).sum(axis=1)},
+                        index=getattr(counts, 'index', None))
+
+
+def value_counts_table(df, column, target='No_Show', classes=('No', 'Yes')):
+    """Counts of every distinct value of ``column`` per class, and the values."""
+    codes, levels = encode(df[column])
+    target_codes = pd.Categorical(df[target], categories=classes).codes
+    counts = count_table(codes, levels, target_codes, classes)
+    return counts, counts.index.to_numpy(dtype=float)
+
+
+def permutation_mean_difference(counts, values, n_resamples=10000, seed=0,
+                                workers=1):
+    """Two-sided permutation test of the difference of the class means."""
+    statistic = partial(mean_difference, values=values)
+    observed = statistic(as_counts(counts))
+    resampled = resample(counts, statistic, 'permutation', n_resamples, seed,
+                         workers)
+    return PermutationResult(observed, permutation_p(observed, resampled,
+                                                     two_sided=True),
+                             n_resamples)
+
+
+def bootstrap_mean_difference(counts, values, n_resamples=10000, seed=0,
+                              workers=1, alpha=0.05):
+    """Difference of the class means with a stratified bootstrap interval."""
+    statistic = partial(mean_difference, values=values)
+    resampled = resample(counts, statistic, 'bootstrap', n_resamples, seed,
+                         workers, stratified=True)
+    return interval(statistic(as_counts(counts)), resampled, alpha)
+
+
+def resample_questions(df, n_resamples=10000, seed=0, workers=1, alpha=0.05,
+                       variables=None):
+    """Permutation and bootstrap counterparts of the questions' tests.
+
+    For every categorical variable (plus Neighbourhood and the binned
+    Waiting_Days): the asymptotic and the permutation p-value of the
+    chi-square test, and the no-show rate of every level with a bootstrap
+    interval. For Age and Waiting_Days: the difference of the mean between
+    shows and no-shows, its bootstrap interval and its permutation p-value.
+    All the batches go to one pool of ``workers`` processes. Returns a dict
+    with 'chi2', 'rates' (a dict of DataFrames) and 'mean_difference'.
+    """
+    if variables is None:
+        variables = CATEGORICAL + ['Neighbourhood']
+    with stage('resample', len(df)):
+        tables = dict(contingency_tables(df, variables))
+        tables['Waiting_Days'] = binned_contingency(df, 'Waiting_Days',
+                                                    method='log')
+        numeric = {column: value_counts_table(df, column)
+                   for column in ('Age', 'Waiting_Days')}
+
+        # One child seed per test, so adding a variable does not change the
+        # resamples of the others
+        tests = [('permutation', name, table.counts, chi2_statistics, False)
+                 for name, table in tables.items()]
+        tests += [('bootstrap', name, table.counts, no_show_rates, False)
+                  for name, table in tables.items()]
+        for column, (counts, values) in numeric.items():
+            statistic = partial(mean_difference, values=values)
+            tests.append(('permutation', column, counts, statistic, False))
+            tests.append(('bootstrap', column, counts, statistic, True))
+        seeds = np.random.SeedSequence(seed).spawn(len(tests))
+        jobs, batches = [], []
+        for (kind, _, counts, statistic, stratified), child in zip(tests,
+                                                                   seeds):
+            test_jobs = _jobs(kind, counts, statistic, n_resamples, child,
+                              stratified)
+            batches.append(len(test_jobs))
+            jobs += test_jobs
+        results = _run_jobs(jobs, workers)
+        resampled = {}
+        start = 0
+        for (kind, name, _, _, _), n_batches in zip(tests, batches):
+            resampled[kind, name] = np.concatenate(
+                results[start:start + n_batches])
+            start += n_batches
+
+    chi2 = []
+    rates = {}
+    for name, table in tables.items():
+        permuted = resampled['permutation', name]
+        chi2.append((name, table.chi2, table.p,
+                     permutation_p(table.chi2, permuted)))
+        counts = table.counts
+        rates[name] = _rates_frame(counts, interval(
+            no_show_rates(as_counts(counts)), resampled['bootstrap', name],
+            alpha))
+    chi2 = pd.DataFrame(chi2, columns=['variable', 'chi2', 'p',
+                                       'p_permutation']).set_index('variable')
+
+    differences = []
+    for column, (counts, values) in numeric.items():
+        observed = mean_difference(as_counts(counts), values)
+        boot = interval(observed, resampled['bootstrap', column], alpha)
+        differences.append((column, observed, boot.ci_low, boot.ci_high,
+                            permutation_p(observed,
+                                          resampled['permutation', column],
+                                          two_sided=True)))
+    differences = pd.DataFrame(differences, columns=[
+        'variable', 'difference', 'ci_low', 'ci_high', 'p_permutation'
+    ]).set_index('variable')
+    return {'chi2': chi2, 'rates': rates, 'mean_difference': differences}
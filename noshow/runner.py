@@ -0,0 +1,121 @@
+"""Run the questions of the analysis in parallel worker processes.
+
+The questions are independent once the cleaned frame exists. The frame is
+shared with the workers as a Feather file (see noshow.cache) that each
+worker memory-maps, reading only the columns its question needs, so the
+data is shared through the page cache instead of being pickled to every
+process. Each worker computes its question and, if asked, renders and
+saves its figures. With ``memo_dir`` the computed results are memoised on
+disk (see noshow.memo) and only questions whose input columns changed are
+recomputed. Run in this process, the questions are computed together in
+one Planner batch (see noshow.plan) instead.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from . import instrument
+from .instrument import stage
+from .memo import ResultCache, question_batch, question_result
+from .questions import QUESTIONS
+
+
+def read_columns(path, columns):
+    """Memory-map a Feather file and return the given columns as a frame."""
+    from pyarrow import feather
+
+    return feather.read_table(path, columns=columns,
+                              memory_map=True).to_pandas()
+
+
+def run_question(path, number, output_dir=None, formats=('png',),
+                 memo_dir=None):
+    """Compute one question from a Feather file (and save its figures).
+
+    Returns ``(result, paths)``, the question's results and the paths of the
+    figures written (empty without ``output_dir``).
+    """
+    return _compute(read_columns(path, QUESTIONS[number].columns), number,
+                    output_dir, formats, memo_dir)
+
+
+def _compute(df, number, output_dir=None, formats=('png',), memo_dir=None):
+    cache = None if memo_dir is None else ResultCache(memo_dir)
+    with stage('q{}'.format(number), len(df)):
+        result = question_result(df, number, cache)
+    return result, _render(number, result, output_dir, formats)
+
+
+def _render(number, result, output_dir, formats):
+    if output_dir is None:
+        return []
+    from .report import render
+    with stage('render.q{}'.format(number)):
+        return render(number, result, output_dir, formats)
+
+
+def _run_batch(df, numbers, output_dir, formats, memo_dir):
+    # One Planner batch for the questions that are not memoised
+    cache = None if memo_dir is None else ResultCache(memo_dir)
+    with stage('questions', len(df)):
+        results = question_batch(df, numbers, cache)
+    return {n: (results[n], _render(n, results[n], output_dir, formats))
+            for n in numbers}
+
+
+def _worker(path, number, output_dir, formats, memo_dir, enabled,
+            trace_memory):
+    # Record in the worker and hand the records back to the parent
+    recorder = instrument.RECORDER
+    recorder.enabled, recorder.trace_memory = enabled, trace_memory
+    recorder.reset()
+    result, paths = run_question(path, number, output_dir, formats, memo_dir)
+    return result, paths, recorder.records
+
+
+def run_questions(source, numbers=None, workers=None, output_dir=None,
+                  formats=('png',), memo_dir=None):
+    """Run questions ``numbers`` (default all) on a process pool.
+
+    ``source`` is the path of a cleaned-frame Feather file or a cleaned
+    DataFrame. ``workers=1`` runs everything in this process, as one batch;
+    otherwise a DataFrame is first written to a temporary Feather file for
+    the workers. ``memo_dir`` enables the on-disk result memo. Returns a
+    dict mapping each question number to its ``(result, paths)``.
+    """
+    numbers = sorted(QUESTIONS) if numbers is None else list(numbers)
+    unknown = set(numbers) - set(QUESTIONS)
+    if unknown:
+        raise ValueError('unknown questions: {}'.format(sorted(unknown)))
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    if isinstance(source, str):
+        return _run(source, numbers, workers, output_dir, formats, memo_dir)
+    if workers == 1:
+        return _run_batch(source, numbers, output_dir, formats, memo_dir)
+    from .cache import write_frame
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'appointments.feather')
+        write_frame(source, path)
+        return _run(path, numbers, workers, output_dir, formats, memo_dir)
+
+
+def _run(path, numbers, workers, output_dir, formats, memo_dir):
+    if workers == 1:
+        columns = sorted({c for n in numbers for c in QUESTIONS[n].columns})
+        return _run_batch(read_columns(path, columns), numbers, output_dir,
+                          formats, memo_dir)
+    workers = min(workers or os.cpu_count() or 1, len(numbers))
+    recorder = instrument.RECORDER
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {n: pool.submit(_worker, path, n, output_dir, formats,
+                                  memo_dir, recorder.enabled,
+                                  recorder.trace_memory)
+                   for n in numbers}
+        results = {}
+        for n, future in futures.items():
+            result, paths, records = future.result()
+            recorder.records.extend(records)
+            results[n] = (result, paths)
+        return results
@@ -0,0 +1,232 @@
+"""No-show risk scores from the analysed variables.
+
+The analysis stops at crosstabs and p-values; the question it asks -- who
+will not show up? -- needs a score per appointment. Every variable of the
+model is discretised into levels: the categorical ones (weekday, the flags,
+Neighbourhood) by their codes, and Age, Waiting_Days and the patient's
+history (see noshow.patients) by fixed bins. The model then has one weight
+per level, and the no-show log-odds of an appointment is
+
+    bias + sum over variables of weight[variable, level of the appointment]
+
+Each variable also has a last level for missing and unseen values, such as a
+neighbourhood that was not in the training data or the first visit of a
+patient. Two ways of fitting the weights:
+
+* 'naive_bayes': the smoothed log ratio of each level's share among
+  no-shows and shows, i.e. the per-level no-show rates of the contingency
+  tables, read off one bincount per variable;
+* 'logistic': logistic regression on the one-hot levels, fitted by block
+  Newton steps (one variable at a time, which is exact within a variable
+  since its levels are disjoint), each step one pair of bincounts.
+
+Scoring a batch is a gather of the weights by level code and a row sum, so
+millions of appointments take a fraction of a second.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .binning import bin_codes, bin_edges
+from .instrument import stage
+from .patients import HISTORY_COLUMNS, PatientIndex
+
+METHODS = ('naive_bayes', 'logistic')
+
+# Variable -> None (categorical codes), bin edges, or 'log' for Waiting_Days
+# bins chosen from the training data. As for bin_edges, the last edge only
+# closes the top bin (values above it still fall in that bin), so every
+# other edge starts a bin.
+_TOP = np.iinfo(np.int32).max
+VARIABLES = OrderedDict([
+    ('Age', np.array([0, 1, 6, 13, 18, 25, 35, 45, 55, 65, 75, 85, _TOP])),
+    ('Waiting_Days', 'log'),
+    ('Appointment_Weekday', None),
+    ('Scholarship', None),
+    ('Hipertension', None),
+    ('Diabetes', None),
+    ('SMS_received', None),
+    ('Neighbourhood', None),
+    ('Prior_Visits', np.array([0, 1, 2, 3, 5, 10, 20, _TOP])),
+    ('Prior_No_Shows', np.array([0, 1, 2, 3, 5, _TOP])),
+    ('Days_Since_Last_Visit', np.array([0, 1, 8, 31, 91, 181, _TOP])),
+])
+
+
+def with_history(df, history=None):
+    """``df`` with the PatientIndex history columns, if it lacks them.
+
+    Without ``history`` they come from ``df`` itself, which then needs its
+    No_Show outcomes (training data). For new bookings pass ``history``, a
+    PatientIndex of the past appointments: each booking is looked up in it
+    by Patient_Id and Appointment_Day, and ``df`` needs no No_Show.
+    """
+    missing = [c for c in HISTORY_COLUMNS if c not in df.columns]
+    if not missing:
+        return df
+    if history is None:
+        features = PatientIndex(df).features()
+    else:
+        features = history.lookup(df)
+    return df.join(features[missing])
+
+
+def roc_auc(labels, scores):
+    """Area under the ROC curve (the Mann-Whitney U statistic, ties halved)."""
+    labels = np.asarray(labels, dtype=bool)
+    ranks = pd.Series(scores).rank().to_numpy()
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    return ((ranks[labels].sum() - positives * (positives + 1) / 2)
+            / (positives * negatives))
+
+
+class RiskModel(object):
+    """One weight per level of every variable; see the module docstring.
+
+    After ``fit``, ``levels`` maps each variable to its level labels (the
+    categories, or the bin edges) and ``weights`` to its weights, the last
+    one for missing or unseen values.
+    """
+
+    def __init__(self, variables=VARIABLES, smoothing=1.0):
+        self.variables = OrderedDict(variables)
+        self.smoothing = smoothing
+        self.levels = OrderedDict()
+        self.weights = OrderedDict()
+        self.bias = 0.0
+
+    def _fit_levels(self, df):
+        for column, spec in self.variables.items():
+            values = df[column]
+            if spec is None:
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    self.levels[column] = values.cat.categories
+                else:
+                    self.levels[column] = pd.Index(np.unique(values.dropna()))
+            elif isinstance(spec, str):
+                self.levels[column] = bin_edges(values.to_numpy(), spec)
+            else:
+                self.levels[column] = np.asarray(spec)
+
+    def _codes(self, values, levels):
+        """Level codes of a column; ``n_levels`` for missing/unseen values."""
+        if isinstance(levels, pd.Index):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Map the categories once, then take the codes
+                mapping = np.append(levels.get_indexer(values.cat.categories),
+                                    -1)
+                codes = mapping[values.cat.codes.to_numpy()]
+            else:
+                codes = levels.get_indexer(values)
+            n_levels = len(levels)
+            codes = np.where(codes < 0, n_levels, codes)
+        else:
+            values = values.to_numpy(dtype=float)
+            codes = bin_codes(values, levels)
+            codes[np.isnan(values)] = len(levels) - 1
+        return codes.astype(np.intp)
+
+    def _n_levels(self, column):
+        levels = self.levels[column]
+        # Categories + unseen, or bins (len(edges) - 1) + missing
+        return len(levels) + 1 if isinstance(levels, pd.Index) else len(levels)
+
+    def codes(self, df):
+        """Matrix of level codes, one column per variable."""
+        codes = np.empty((len(df), len(self.levels)), dtype=np.intp)
+        for i, (column, levels) in enumerate(self.levels.items()):
+            codes[:, i] = self._codes(df[column], levels)
+        return codes
+
+    def fit(self, df, method='naive_bayes', iterations=8, l2=1.0):
+        """Fit the weights on a cleaned frame with a No_Show column.
+
+        The history columns are computed with PatientIndex if ``df`` does
+        not have them. ``iterations`` and the ridge penalty ``l2`` only
+        apply to 'logistic'.
+        """
+        if method not in METHODS:
+            raise ValueError('method must be one of {}'.format(METHODS))
+        with stage('score.fit', len(df)):
+            df = with_history(df)
+            self._fit_levels(df)
+            codes = self.codes(df)
+            y = (df['No_Show'] == 'Yes').to_numpy()
+            if method == 'naive_bayes':
+                self._fit_naive_bayes(codes, y)
+            else:
+                self._fit_logistic(codes, y, iterations, l2)
+        return self
+
+    def _fit_naive_bayes(self, codes, y):
+        a = self.smoothing
+        n_yes = y.sum()
+        n_no = len(y) - n_yes
+        self.bias = float(np.log(n_yes / n_no))
+        for i, column in enumerate(self.levels):
+            size = self._n_levels(column)
+            counts = np.bincount(codes[:, i] * 2 + y,
+                                 minlength=2 * size).reshape(size, 2)
+            share_no = (counts[:, 0] + a) / (n_no + a * size)
+            share_yes = (counts[:, 1] + a) / (n_yes + a * size)
+            self.weights[column] = np.log(share_yes / share_no)
+
+    def _fit_logistic(self, codes, y, iterations, l2):
+        rate = y.mean()
+        self.bias = float(np.log(rate / (1 - rate)))
+        for column in self.levels:
+            self.weights[column] = np.zeros(self._n_levels(column))
+        logit = np.full(len(y), self.bias)
+        target = y.astype(float)
+        for _ in range(iterations):
+            for i, column in enumerate(self.levels):
+                weights = self.weights[column]
+                p = 1 / (1 + np.exp(-logit))
+                gradient = np.bincount(codes[:, i], target - p, len(weights))
+                hessian = np.bincount(codes[:, i], p * (1 - p), len(weights))
+                step = (gradient - l2 * weights) / (hessian + l2)
+                weights += step
+                logit += step[codes[:, i]]
+
+    def contributions(self, df):
+        """Per-variable log-odds contributions of every appointment."""
+        codes = self.codes(df)
+        return pd.DataFrame({column: self.weights[column][codes[:, i]]
+                             for i, column in enumerate(self.levels)},
+                            index=df.index)
+
+    def logit(self, df):
+        """No-show log-odds of every appointment of ``df``."""
+        logit = np.full(len(df), self.bias)
+        for column, levels in self.levels.items():
+            logit += self.weights[column][self._codes(df[column], levels)]
+        return logit
+
+    def score(self, df):
+        """No-show probability of every appointment of ``df``.
+
+        ``df`` needs the model's variables, including the history columns;
+        for a batch of bookings use ``with_history(batch,
+        PatientIndex(past))``.
+        """
+        with stage('score', len(df)):
+            return 1 / (1 + np.exp(-self.logit(df)))
+
+    def summary(self):
+        """Weights of every level, indexed by (variable, level)."""
+        frames = []
+        for column, levels in self.levels.items():
+            if isinstance(levels, pd.Index):
+                labels = [str(level) for level in levels] + ['unseen']
+            else:
+                labels = ['{}-{}'.format(low, high - 1) if high - low > 1
+                          else str(low) for low, high in zip(levels[:-2],
+                                                             levels[1:-1])]
+                labels += ['{}+'.format(levels[-2]), 'missing']
+            frames.append(pd.Series(self.weights[column][:len(labels)],
+                                    index=labels))
+        return pd.concat(frames, keys=list(self.levels),
+                         names=['variable', 'level']).rename('weight')
@@ -0,0 +1,400 @@
+"""Approximate, fixed-memory summaries of high-cardinality columns.
+
+The notebook counts duplicated patients and appointments with
+``duplicated()`` and ranks repeat patients with ``value_counts()``, each
+building a hash table over every id; on a multi-year feed that alone takes
+hundreds of MB. The sketches here have a size fixed by their error bound,
+are updated a chunk at a time with vectorised NumPy, and merge by an
+elementwise operation, so chunks or files can be summarised separately:
+
+* HyperLogLog: distinct counts (patients, appointments), relative standard
+  error about ``1.04 / sqrt(2 ** precision)``;
+* CountMinSketch: frequencies, overestimating by at most ``epsilon`` times
+  the total with probability ``1 - delta``; TopK keeps the ``k`` most
+  frequent keys (repeat patients, neighbourhoods) as candidates scored by
+  one;
+* TDigest: quantiles of Age and Waiting_Days (what ``describe()``
+  reports), most accurate in the tails, with about ``compression``
+  centroids.
+
+SketchAggregator bundles them for the appointments table.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import clean_appointments
+from .instrument import stage
+from .loader import DATA_FILE, iter_appointments
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+# Stands in for a missing categorical value before mixing
+_NULL = 0x6E756C6C6E756C6C
+
+
+def mix64(x):
+    """splitmix64 finaliser: a well-spread 64-bit hash of uint64 values."""
+    with np.errstate(over='ignore'):
+        x = (x + np.uint64(0x9E3779B97F4A7C15)) & _MASK64
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def hash64(values, seed=0):
+    """Vectorised 64-bit hashes of a column (numbers, dates or strings)."""
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Hash the categories once and look the codes up; code -1 (missing)
+        # picks the null hash appended at the end
+        categories = np.append(hash64(values.cat.categories.to_numpy(), seed),
+                               mix64(np.array([_NULL], dtype=np.uint64)
+                                     ^ np.uint64(seed)))
+        return categories[values.cat.codes.to_numpy()]
+    if isinstance(values.dtype, pd.DatetimeTZDtype) or \
+            values.dtype.kind in 'Mm':
+        # Nanoseconds, so the hash does not depend on the stored unit
+        unit = 'datetime64[ns]' if values.dtype.kind != 'm' \
+            else 'timedelta64[ns]'
+        raw = values.values.astype(unit).view(np.uint64)
+    elif values.dtype.kind in 'iub':
+        raw = values.to_numpy().astype(np.int64).view(np.uint64)
+    elif values.dtype.kind == 'f':
+        raw = values.to_numpy(dtype=np.float64).view(np.uint64)
+    else:
+        raw = pd.util.hash_array(values.to_numpy(dtype=object))
+    return mix64(raw ^ np.uint64(seed))
+
+
+class HyperLogLog(object):
+    """Distinct-count sketch of ``2 ** precision`` one-byte registers."""
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError('precision must be between 4 and 18')
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def from_error(cls, error):
+        """Sketch with a relative standard error of at most ``error``."""
+        return cls(min(18, max(4, math.ceil(2 * math.log2(1.04 / error)))))
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update_hashes(self, hashes):
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rest = (hashes << p) & _MASK64
+        # Position of the first 1 bit of ``rest``; frexp of the top 53 bits
+        # is exact, and rest == 0 below them is too rare to matter
+        _, exponent = np.frexp((rest >> np.uint64(11)).astype(np.float64))
+        rank = np.minimum(54 - exponent, 65 - self.precision).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def update(self, values):
+        return self.update_hashes(hash64(values))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches of different precision')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimated number of distinct values.
+
+        Ertl's improved estimator (2017), which is unbiased from a handful
+        of values to billions without the bias tables of HyperLogLog++.
+        """
+        m = len(self.registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=q + 2)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * math.log(2)) / z))
+
+
+def _sigma(x):
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x):
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class CountMinSketch(object):
+    """Frequency sketch: ``depth`` rows of ``width`` counters."""
+
+    def __init__(self, width=2719, depth=5):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon=0.001, delta=0.01):
+        """Overestimates by at most ``epsilon * total`` w.p. ``1 - delta``."""
+        return cls(math.ceil(math.e / epsilon),
+                   math.ceil(math.log(1 / delta)))
+
+    def _columns(self, hashes):
+        # One hash per row from two halves of the 64-bit hash
+        # (Kirsch-Mitzenmacher)
+        low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        high = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        rows = np.arange(self.depth, dtype=np.int64)[:, np.newaxis]
+        return (low + rows * high) % self.width
+
+    def update_hashes(self, hashes, counts=None):
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(columns[row], counts,
+                                           self.width).astype(np.int64)
+        self.total += len(hashes) if counts is None else int(np.sum(counts))
+        return self
+
+    def update(self, values, counts=None):
+        return self.update_hashes(hash64(values), counts)
+
+    def query_hashes(self, hashes):
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, np.newaxis],
+                          columns].min(axis=0)
+
+    def query(self, values):
+        """Estimated count of each value (never below the true count)."""
+        return self.query_hashes(hash64(values))
+
+    def merge(self, other):
+        if self.table.shape != other.table.shape:
+            raise ValueError('cannot merge sketches of different sizes')
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+class TopK(object):
+    """The ``k`` most frequent keys, estimated with a CountMinSketch.
+
+    Keeps at most ``capacity`` candidate keys; after every update the
+    candidates and the chunk's keys are scored by the sketch and the best
+    ``capacity`` kept, so memory does not grow with the number of keys.
+    """
+
+    def __init__(self, k=10, capacity=None, epsilon=0.001, delta=0.01):
+        self.k = k
+        self.capacity = capacity or 4 * k
+        self.sketch = CountMinSketch.from_error(epsilon, delta)
+        self.keys = None
+
+    def _keep(self, keys):
+        keys = pd.unique(keys) if len(keys) else keys
+        estimates = self.sketch.query(keys)
+        if len(keys) > self.capacity:
+            best = np.argpartition(-estimates, self.capacity - 1)
+            keys = keys[best[:self.capacity]]
+        self.keys = keys
+
+    def update(self, values):
+        values = values if isinstance(values, pd.Series) else pd.Series(values)
+        counts = values.value_counts(sort=False)
+        counts = counts[counts > 0]
+        keys = counts.index.to_numpy()
+        self.sketch.update(keys, counts.to_numpy())
+        if self.keys is not None:
+            keys = np.concatenate([self.keys, keys])
+        self._keep(keys)
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        keys = [k for k in (self.keys, other.keys) if k is not None]
+        if keys:
+            self._keep(np.concatenate(keys))
+        return self
+
+    def top(self, k=None):
+        """Series of the estimated counts of the top ``k`` keys."""
+        k = self.k if k is None else k
+        if self.keys is None:
+            return pd.Series(dtype=np.int64)
+        counts = pd.Series(self.sketch.query(self.keys), index=self.keys)
+        return counts.sort_values(ascending=False, kind='stable').head(k)
+
+
+class TDigest(object):
+    """Mergeable quantile sketch of about ``compression`` centroids."""
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Midpoint quantile of every item through the k1 scale function;
+        # items in the same unit of k form one centroid, which keeps
+        # centroids small near q = 0 and q = 1
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.intp)
+        sums = np.bincount(cluster, weights * means)
+        counts = np.bincount(cluster, weights)
+        present = counts > 0
+        self.means = sums[present] / counts[present]
+        self.weights = counts[present]
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=float)
+        present = ~np.isnan(values)
+        values = values[present]
+        if weights is not None:
+            # Dropping the missing values must keep the weights aligned
+            weights = np.asarray(weights, dtype=float)[present]
+        if not len(values):
+            return self
+        if weights is None:
+            # Integer-valued columns have few distinct values
+            values, weights = np.unique(values, return_counts=True)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights,
+                                       np.asarray(weights, dtype=float)]))
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def quantile(self, q):
+        """Estimated quantiles ``q`` (scalar or array in [0, 1])."""
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan)
+        total = self.weights.sum()
+        centres = (np.cumsum(self.weights) - self.weights / 2) / total
+        positions = np.concatenate([[0], centres, [1]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q, positions, values)
+
+    def mean(self):
+        return float((self.means * self.weights).sum() / self.weights.sum())
+
+
+class SketchAggregator(object):
+    """Fixed-memory summary of the appointments table.
+
+    ``distinct_error`` is the relative error of the distinct counts,
+    ``epsilon``/``delta`` the Count-Min bound of the top-k counts and
+    ``compression`` the t-digest size.
+    """
+
+    def __init__(self, distinct_error=0.01, epsilon=0.0001, delta=0.01,
+                 k=10, compression=200):
+        self.rows = 0
+        self.patients = HyperLogLog.from_error(distinct_error)
+        self.appointments = HyperLogLog.from_error(distinct_error)
+        self.repeat_patients = TopK(k, epsilon=epsilon, delta=delta)
+        self.neighbourhoods = TopK(k, epsilon=epsilon, delta=delta)
+        self.no_show_neighbourhoods = TopK(k, epsilon=epsilon, delta=delta)
+        self.digests = {'Age': TDigest(compression),
+                        'Waiting_Days': TDigest(compression)}
+
+    def update(self, chunk):
+        """Add a cleaned chunk."""
+        with stage('sketch.update', len(chunk)):
+            self.rows += len(chunk)
+            self.patients.update(chunk['Patient_Id'])
+            self.appointments.update(chunk['Appointment_ID'])
+            self.repeat_patients.update(chunk['Patient_Id'])
+            self.neighbourhoods.update(chunk['Neighbourhood'])
+            no_show = (chunk['No_Show'] == 'Yes').to_numpy()
+            self.no_show_neighbourhoods.update(chunk['Neighbourhood'][no_show])
+            for column, digest in self.digests.items():
+                digest.update(chunk[column].to_numpy())
+        return self
+
+    def update_csv(self, path=DATA_FILE, chunksize=1000000):
+        """Load, clean and add a CSV export one chunk at a time."""
+        for chunk in iter_appointments(path, chunksize):
+            self.update(clean_appointments(chunk))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.patients.merge(other.patients)
+        self.appointments.merge(other.appointments)
+        self.repeat_patients.merge(other.repeat_patients)
+        self.neighbourhoods.merge(other.neighbourhoods)
+        self.no_show_neighbourhoods.merge(other.no_show_neighbourhoods)
+        for column, digest in self.digests.items():
+            digest.merge(other.digests[column])
+        return self
+
+    def distinct(self):
+        """Approximate distinct and duplicated patient and appointment ids.
+
+        One row per id with the row count, the estimated number of distinct
+        ids, its error bound (three standard errors of the HyperLogLog) and
+        the number of repeated ids. That difference is only reported when
+        it exceeds the error bound; below it the sketch cannot tell
+        duplicates from estimation error, and it is nan.
+        """
+        rows = []
+        for name, sketch in [('Patient_Id', self.patients),
+                             ('Appointment_ID', self.appointments)]:
+            distinct = min(sketch.count(), self.rows)
+            bound = int(math.ceil(3 * sketch.error * distinct))
+            duplicated = self.rows - distinct
+            rows.append((name, self.rows, distinct, bound,
+                         duplicated if duplicated > bound else np.nan))
+        return pd.DataFrame(rows, columns=['id', 'rows', 'distinct',
+                                           'error_bound', 'duplicated']
+                            ).set_index('id')
+
+    def describe(self):
+        """Approximate ``describe()`` of Age and Waiting_Days."""
+        q = [0.25, 0.5, 0.75]
+        return pd.DataFrame({
+            column: [digest.count, digest.mean(), digest.min]
+            + list(digest.quantile(q)) + [digest.max]
+            for column, digest in self.digests.items()},
+            index=['count', 'mean', 'min', '25%', '50%', '75%', 'max'])
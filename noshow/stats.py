@@ -0,0 +1,250 @@
+"""Statistical tests used to answer the questions of the analysis.
+
+The chi-square tests work on a stack of tables at once: expected
+frequencies, statistics, degrees of freedom and p-values are computed with a
+handful of array operations over an ``(n_tables, rows, cols)`` array, rather
+than one ``scipy.stats.chi2_contingency`` call per table. Tables of different
+shapes are zero-padded; rows and columns that are all zero do not count
+towards the degrees of freedom.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Chi2Result = namedtuple('Chi2Result', ['chi2', 'p', 'dof', 'expected'])
+
+ADJUSTMENTS = ('fdr_bh', 'bonferroni', None)
+
+
+def as_counts(tables):
+    """Return ``tables`` as an int64 array, refusing anything but counts.
+
+    Chi-square tests are only valid on counts. A row-normalised table (what
+    ``pd.crosstab(..., normalize='index')`` returns) raises a ValueError
+    instead of silently giving a p-value close to 1.
+    """
+    values = np.asarray(tables)
+    if values.dtype.kind not in 'iu':
+        if values.dtype.kind != 'f' or not np.all(np.mod(values, 1) == 0):
+            raise ValueError('chi-square tests need a table of counts, got '
+                             'non-integer values (a proportion table?)')
+    if (values < 0).any():
+        raise ValueError('chi-square tests need a table of counts, got '
+                         'negative values')
+    return values.astype(np.int64, copy=False)
+
+
+def stack_tables(tables):
+    """Zero-pad a list of 2-D count tables into one 3-D array."""
+    tables = [as_counts(t) for t in tables]
+    rows = max(t.shape[0] for t in tables)
+    cols = max(t.shape[1] for t in tables)
+    stacked = np.zeros((len(tables), rows, cols), dtype=np.int64)
+    for i, t in enumerate(tables):
+        stacked[i, :t.shape[0], :t.shape[1]] = t
+    return stacked
+
+
+def chi2_statistic(observed):
+    """Pearson's statistic and expected counts of a ``(..., rows, cols)`` stack.
+
+    No validation and no p-values, for the many tables of a resampling run.
+    """
+    observed = np.asarray(observed, dtype=float)
+    row_sums = observed.sum(axis=-1, keepdims=True)
+    col_sums = observed.sum(axis=-2, keepdims=True)
+    totals = row_sums.sum(axis=-2, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = row_sums * col_sums / totals
+        cells = np.where(expected > 0, (observed - expected) ** 2 / expected, 0)
+    return cells.sum(axis=(-2, -1)), expected
+
+
+def chi2_batch(tables):
+    """Pearson's chi-square test of independence on a stack of count tables.
+
+    ``tables`` has shape ``(n_tables, rows, cols)``. Returns a Chi2Result of
+    arrays of length ``n_tables`` (``expected`` has the shape of ``tables``).
+    Tables with fewer than two non-empty rows or columns get a nan p-value.
+    Raises ValueError if ``tables`` does not hold counts.
+    """
+    from scipy.stats import chi2 as chi2_dist
+
+    observed = as_counts(tables).astype(float)
+    statistic, expected = chi2_statistic(observed)
+    row_sums = observed.sum(axis=2, keepdims=True)
+    col_sums = observed.sum(axis=1, keepdims=True)
+    dof = ((np.count_nonzero(row_sums[:, :, 0], axis=1) - 1)
+           * (np.count_nonzero(col_sums[:, 0, :], axis=1) - 1))
+    dof = np.maximum(dof, 0)
+    p = np.full(len(statistic), np.nan)
+    testable = dof > 0
+    p[testable] = chi2_dist.sf(statistic[testable], dof[testable])
+    return Chi2Result(statistic, p, dof, expected)
+
+
+def chi2_test(counts):
+    """Chi-square test of a single 2-D count table.
+
+    Same result as ``scipy.stats.chi2_contingency(counts, correction=False)``.
+    """
+    result = chi2_batch(as_counts(counts)[np.newaxis])
+    return Chi2Result(result.chi2[0], result.p[0], int(result.dof[0]),
+                      result.expected[0])
+
+
+def adjust_pvalues(p, method='fdr_bh'):
+    """Correct p-values for multiple testing (nan p-values are left out).
+
+    ``method`` is 'fdr_bh' (Benjamini-Hochberg), 'bonferroni' or None.
+    """
+    if method not in ADJUSTMENTS:
+        raise ValueError('method must be one of {}'.format(ADJUSTMENTS))
+    p = np.asarray(p, dtype=float)
+    adjusted = p.copy()
+    valid = ~np.isnan(p)
+    m = valid.sum()
+    if method is None or m == 0:
+        return adjusted
+    values = p[valid]
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(values * m, 1)
+        return adjusted
+    order = np.argsort(values)
+    ranked = values[order] * m / np.arange(1, m + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(ranked, 1)
+    adjusted[valid] = result
+    return adjusted
+
+
+def chi2_results(tables, index=None, adjust='fdr_bh', alpha=0.05):
+    """Tidy table of batched chi-square tests.
+
+    ``tables`` is a 3-D count array (or a list of 2-D tables); ``index``
+    labels its first axis and may be a MultiIndex, e.g. neighbourhood x
+    variable. Returns chi2, dof, p, the adjusted p-value and whether the
+    null hypothesis is rejected at ``alpha`` after adjustment.
+    """
+    if not isinstance(tables, np.ndarray):
+        tables = stack_tables(tables)
+    result = chi2_batch(tables)
+    p_adjusted = adjust_pvalues(result.p, adjust)
+    return pd.DataFrame({'chi2': result.chi2,
+                         'dof': result.dof,
+                         'p': result.p,
+                         'p_adjusted': p_adjusted,
+                         'significant': p_adjusted <= alpha},
+                        index=index)
+
+
+class Moments(namedtuple('Moments', ['n', 'mean', 'm2'])):
+    """Count, mean and sum of squared deviations of one or more groups.
+
+    Fields may be scalars or arrays (one entry per group). Moments of
+    separate chunks are combined with ``merge`` (Chan et al.'s parallel
+    update), so a column never has to be materialised as a whole.
+    """
+
+    __slots__ = ()
+
+    @property
+    def var(self):
+        """Sample variance (nan for groups with fewer than two values)."""
+        n = np.asarray(self.n, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > 1, self.m2 / (n - 1), np.nan)
+
+    def group(self, i):
+        """Moments of the group(s) at position ``i``."""
+        return Moments(self.n[i], self.mean[i], self.m2[i])
+
+    def merge(self, other):
+        n = self.n + other.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = other.mean - self.mean
+            mean = np.where(n > 0, self.mean + delta * other.n / n, 0.0)
+            m2 = np.where(n > 0, self.m2 + other.m2
+                          + delta ** 2 * self.n * other.n / n, 0.0)
+        return Moments(n, mean, m2)
+
+
+def group_moments(values, codes, n_groups):
+    """Moments of ``values`` per group, given integer group ``codes``.
+
+    Rows with a negative code are ignored.
+    """
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes)
+    valid = codes >= 0
+    if not valid.all():
+        values, codes = values[valid], codes[valid]
+    n = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, np.bincount(codes, values, n_groups) / n, 0.0)
+    deviations = values - mean[codes]
+    m2 = np.bincount(codes, deviations * deviations, n_groups)
+    return Moments(n, mean, m2)
+
+
+def class_moments(data, column, target='No_Show', classes=('No', 'Yes')):
+    """Moments of ``column`` per target class.
+
+    ``data`` is a DataFrame or an iterable of DataFrame chunks (e.g.
+    ``iter_appointments``); chunks are reduced one at a time and merged.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = [data]
+    total = None
+    for chunk in data:
+        codes = pd.Categorical(chunk[target], categories=classes).codes
+        moments = group_moments(chunk[column].to_numpy(), codes, len(classes))
+        total = moments if total is None else total.merge(moments)
+    return total
+
+
+TTestResult = namedtuple('TTestResult', ['statistic', 'p', 'dof', 'difference',
+                                         'ci_low', 'ci_high'])
+
+
+def ttest_moments(a, b, equal_var=True, alpha=0.05):
+    """Two-sample t-test of the means of two groups given their Moments.
+
+    ``equal_var=True`` is Student's test (what ``scipy.stats.ttest_ind``
+    does by default), False is Welch's. Also returns the difference of the
+    means (a - b) and its ``1 - alpha`` confidence interval. Works
+    elementwise when the Moments hold arrays, e.g. one entry per
+    neighbourhood.
+    """
+    from scipy.stats import t as t_dist
+
+    na = np.asarray(a.n, dtype=float)
+    nb = np.asarray(b.n, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if equal_var:
+            dof = na + nb - 2
+            pooled = (a.m2 + b.m2) / dof
+            se = np.sqrt(pooled * (1 / na + 1 / nb))
+        else:
+            va, vb = a.var / na, b.var / nb
+            se = np.sqrt(va + vb)
+            dof = (va + vb) ** 2 / (va ** 2 / (na - 1) + vb ** 2 / (nb - 1))
+        difference = a.mean - b.mean
+        statistic = difference / se
+    p = 2 * t_dist.sf(np.abs(statistic), dof)
+    margin = t_dist.ppf(1 - alpha / 2, dof) * se
+    return TTestResult(statistic, p, dof, difference,
+                       difference - margin, difference + margin)
+
+
+def ttest_by_class(data, column, target='No_Show', classes=('No', 'Yes'),
+                   equal_var=True, alpha=0.05):
+    """t-test of ``column`` between the two target classes (see class_moments).
+
+    The notebook's Question 2 test is ``ttest_by_class(df, 'Age')``.
+    """
+    moments = class_moments(data, column, target, classes)
+    return ttest_moments(moments.group(0), moments.group(1), equal_var, alpha)
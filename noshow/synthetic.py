@@ -0,0 +1,155 @@
+"""Synthetic appointments with the schema and distributions of the Kaggle export.
+
+Used by the benchmarks to produce files far larger than the 110k rows of
+noshowappointments-kagglev2-may-2016.csv. The marginals follow the Kaggle
+data: about 1.8 appointments per patient with a long tail of frequent
+patients, 81 neighbourhoods with skewed sizes, the age bands, 40% same-day
+appointments and roughly exponential waiting periods, the flag rates, and a
+no-show rate of about 20% that depends on waiting days, age, Scholarship and
+SMS_received. A few invalid ages and negative waiting periods are kept so
+the cleaning rules have something to do.
+
+Rows are generated chunk by chunk from a seed, so any size can be written
+with bounded memory and the same call always writes the same file.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .loader import COLUMNS
+
+# Share of ages in 0-9, 10-19, ..., 90-99 and 100-115
+AGE_BANDS = [0.158, 0.117, 0.124, 0.137, 0.129, 0.144, 0.107, 0.054, 0.027,
+             0.0037, 0.0003]
+AGE_EDGES = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 116]
+# Monday..Saturday
+WEEKDAY_SHARES = [0.205, 0.232, 0.234, 0.156, 0.172, 0.0004]
+# Hour of day at which appointments are scheduled, 6h..21h
+HOUR_SHARES = [0.014, 0.174, 0.139, 0.116, 0.1, 0.077, 0.049, 0.082, 0.083,
+               0.073, 0.05, 0.026, 0.012, 0.004, 0.001, 0.0003]
+FLAG_RATES = {'Scholarship': 0.098, 'Hipertension': 0.197, 'Diabetes': 0.072,
+              'Alcoholism': 0.030, 'SMS_received': 0.321}
+HANDCAP_SHARES = [0.9797, 0.0185, 0.0017, 0.00012, 0.00003]
+SAME_DAY = 0.396
+MEAN_WAIT = 15.8
+N_NEIGHBOURHOODS = 81
+# Size of the patient pool per row and skew of the draw from it; together
+# they give ~0.56 distinct patients per row and a tail like the Kaggle data
+PATIENT_POOL = 0.9
+PATIENT_SKEW = 1.6
+ROWS_PER_DAY = 2700
+START = np.datetime64('2016-04-25')  # a Monday
+NO_SHOW_RATE = 0.20
+INVALID_AGE_RATE = 1e-5
+NEGATIVE_WAIT_RATE = 5e-5
+
+
+def _shares(values):
+    values = np.asarray(values, dtype=float)
+    return values / values.sum()
+
+
+def neighbourhood_names(n=N_NEIGHBOURHOODS):
+    return np.array(['BAIRRO {:02d}'.format(i + 1) for i in range(n)],
+                    dtype=object)
+
+
+def _no_show_intercept(rng, size=200000):
+    """Intercept of the no-show model that gives NO_SHOW_RATE overall."""
+    sample = _features(rng, size, n_rows=size)
+    logit = _logit(sample, 0.0)
+    low, high = -10.0, 10.0
+    for _ in range(40):
+        mid = (low + high) / 2
+        if (1 / (1 + np.exp(-(logit + mid)))).mean() < NO_SHOW_RATE:
+            low = mid
+        else:
+            high = mid
+    return mid
+
+
+def _features(rng, size, n_rows):
+    band = rng.choice(len(AGE_BANDS), size, p=_shares(AGE_BANDS))
+    low, high = np.take(AGE_EDGES, band), np.take(AGE_EDGES, band + 1)
+    age = rng.integers(low, high)
+    same_day = rng.random(size) < SAME_DAY
+    wait = np.where(same_day, 0,
+                    1 + np.minimum(rng.exponential(MEAN_WAIT - 1, size), 177))
+    features = {'Age': age.astype(np.int64), 'wait': wait.astype(np.int64)}
+    for var, rate in FLAG_RATES.items():
+        features[var] = (rng.random(size) < rate).astype(np.int8)
+    return features
+
+
+def _logit(features, intercept):
+    return (intercept + 0.45 * np.log1p(features['wait'])
+            - 0.008 * (features['Age'] - 37)
+            + 0.15 * features['Scholarship'] - 0.1 * features['Hipertension']
+            + 0.1 * features['SMS_received'])
+
+
+def generate_chunk(rng, start_row, size, n_rows, intercept):
+    """``size`` synthetic rows, as they appear in the CSV (source headers)."""
+    features = _features(rng, size, n_rows)
+    age, wait = features['Age'], features['wait']
+
+    n_patients = max(1, int(n_rows * PATIENT_POOL))
+    # Power-law patient draw: a few patients get many appointments
+    patient = np.floor(n_patients * rng.random(size) ** PATIENT_SKEW)
+    patient = patient.astype(np.int64)
+    patient_id = (patient * 6364136223846793005 + 1442695040888963407) \
+        % 999999999999989 + 10000
+
+    n_weeks = max(1, n_rows // (ROWS_PER_DAY * 5))
+    week = rng.integers(0, n_weeks, size)
+    weekday = rng.choice(len(WEEKDAY_SHARES), size, p=_shares(WEEKDAY_SHARES))
+    appointment_day = START + (7 * week + weekday).astype('timedelta64[D]')
+
+    negative = rng.random(size) < NEGATIVE_WAIT_RATE
+    offset = np.where(negative, -rng.integers(1, 7, size), wait)
+    hour = 6 + rng.choice(len(HOUR_SHARES), size, p=_shares(HOUR_SHARES))
+    seconds = hour * 3600 + rng.integers(0, 3600, size)
+    scheduled = ((appointment_day - offset.astype('timedelta64[D]'))
+                 .astype('datetime64[s]') + seconds.astype('timedelta64[s]'))
+    age = np.where(rng.random(size) < INVALID_AGE_RATE, -1, age)
+
+    probability = 1 / (1 + np.exp(-_logit(features, intercept)))
+    no_show = rng.random(size) < probability
+    hoods = neighbourhood_names()
+    hood_weights = _shares(1 / np.arange(1, len(hoods) + 1) ** 1.1)
+
+    return pd.DataFrame({
+        'PatientId': patient_id,
+        'AppointmentID': 5030230 + start_row + rng.permutation(size),
+        'Gender': np.where(rng.random(size) < 0.65, 'F', 'M'),
+        'ScheduledDay': np.datetime_as_string(scheduled, unit='s') + 'Z',
+        'AppointmentDay': np.datetime_as_string(
+            appointment_day.astype('datetime64[s]'), unit='s') + 'Z',
+        'Age': age,
+        'Neighbourhood': hoods[rng.choice(len(hoods), size, p=hood_weights)],
+        'Scholarship': features['Scholarship'],
+        'Hipertension': features['Hipertension'],
+        'Diabetes': features['Diabetes'],
+        'Alcoholism': features['Alcoholism'],
+        'Handcap': rng.choice(len(HANDCAP_SHARES), size,
+                              p=_shares(HANDCAP_SHARES)).astype(np.int8),
+        'SMS_received': features['SMS_received'],
+        'No-show': np.where(no_show, 'Yes', 'No'),
+    }, columns=list(COLUMNS))
+
+
+def iter_synthetic(n_rows, chunksize=1000000, seed=0):
+    """Yield ``n_rows`` synthetic rows in chunks of at most ``chunksize``."""
+    rng = np.random.default_rng(seed)
+    intercept = _no_show_intercept(np.random.default_rng(seed + 1))
+    for start in range(0, n_rows, chunksize):
+        size = min(chunksize, n_rows - start)
+        yield generate_chunk(rng, start, size, n_rows, intercept)
+
+
+def write_synthetic(path, n_rows, chunksize=1000000, seed=0):
+    """Write a synthetic export of ``n_rows`` rows to ``path`` as CSV."""
+    for i, chunk in enumerate(iter_synthetic(n_rows, chunksize, seed)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0,
+                     index=False)
+    return path
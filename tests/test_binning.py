@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noshow.binning import BIN_METHODS, bin_codes, bin_edges
+from noshow.questions import QUESTIONS
+
+
+@pytest.mark.parametrize('method', BIN_METHODS)
+def test_weighted_edges_match_expanded_values(method):
+    rng = np.random.default_rng(0)
+    values = rng.geometric(0.05, 5000) - 1
+    distinct, counts = np.unique(values, return_counts=True)
+    np.testing.assert_array_equal(
+        bin_edges(distinct, method, weights=counts), bin_edges(values, method))
+
+
+@pytest.mark.parametrize('method', BIN_METHODS)
+def test_every_value_falls_in_a_bin(method):
+    values = np.array([0, 1, 2, 3, 7, 8, 100, 179])
+    edges = bin_edges(values, method, n_bins=4)
+    codes = bin_codes(values, edges)
+    assert codes.min() == 0 and codes.max() == len(edges) - 2
+    assert (np.diff(codes) >= 0).all()
+
+
+@pytest.mark.parametrize('method', BIN_METHODS)
+def test_no_values_give_one_empty_bin(method):
+    np.testing.assert_array_equal(bin_edges([], method), [0, 1])
+    np.testing.assert_array_equal(bin_edges([3, 5], method, weights=[0, 0]),
+                                  [0, 1])
+
+
+def test_question_8_on_an_empty_frame():
+    df = pd.DataFrame({
+        'Waiting_Days': np.array([], dtype=np.int16),
+        'No_Show': pd.Categorical([], categories=['No', 'Yes']),
+    })
+    counts = QUESTIONS[8].compute(df)['waiting_days'].counts
+    assert counts.to_numpy().sum() == 0
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from noshow.cache import (MAX_FRAMES, build_if_missing, cache_path,
+                          cached_frames, evict, load_clean)
+from noshow.cleaning import CLEANING_VERSION
+from noshow.synthetic import write_synthetic
+
+pytest.importorskip('pyarrow')
+
+
+def _touch(path, mtime):
+    with open(path, 'w'):
+        pass
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_removes_stale_and_least_recently_used(tmp_path):
+    stale = tmp_path / 'appointments-old-v{}.feather'.format(
+        CLEANING_VERSION - 1)
+    frames = [tmp_path / 'appointments-{}-v{}.feather'.format(
+        i, CLEANING_VERSION) for i in range(MAX_FRAMES + 2)]
+    other = tmp_path / 'notes.txt'
+    for mtime, path in enumerate([stale] + frames + [other]):
+        _touch(str(path), 1000 + mtime)
+    os.makedirs(str(tmp_path / 'results'))
+    evict(str(tmp_path))
+    assert [path for _, path in cached_frames(str(tmp_path))] \
+        == [str(path) for path in frames[-MAX_FRAMES:]]
+    assert other.exists() and (tmp_path / 'results').is_dir()
+
+
+def test_build_if_missing_returns_the_built_frame_once(tmp_path):
+    csv = str(tmp_path / 'export.csv')
+    write_synthetic(csv, 2000, seed=1)
+    cache_dir = str(tmp_path / 'cache')
+    target, df = build_if_missing(csv, cache_dir)
+    assert target == cache_path(csv, cache_dir) and os.path.exists(target)
+    assert df is not None and len(df) > 0
+    again, cached = build_if_missing(csv, cache_dir)
+    assert again == target and cached is None
+    assert load_clean(csv, cache_dir).equals(df)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noshow.features import (add_date_features, lead_time_codes,
+                             parse_timestamps, weekday_codes)
+
+
+def _timestamps(n, seed=0):
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(-2 * 10 ** 9, 4 * 10 ** 9, n)
+    return pd.Series(pd.to_datetime(seconds, unit='s', utc=True)
+                     .strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+
+def test_parse_timestamps_matches_pandas():
+    values = pd.concat([_timestamps(10000), pd.Series([
+        '2016-02-29T23:59:59Z', '2000-02-29T00:00:00Z', '1900-03-01T00:00:00Z',
+        '1970-01-01T00:00:00Z', '2016-12-31T12:30:45Z'])], ignore_index=True)
+    expected = pd.to_datetime(values, format='ISO8601', utc=True)
+    pd.testing.assert_series_equal(parse_timestamps(values),
+                                   expected.astype('datetime64[s, UTC]'))
+
+
+def test_parse_timestamps_other_formats_fall_back():
+    values = pd.Series(['2016-04-29 18:38:08', '2016-04-29T00:00:00+01:00'])
+    expected = pd.to_datetime(values, format='ISO8601', utc=True)
+    pd.testing.assert_series_equal(parse_timestamps(values), expected)
+
+
+@pytest.mark.parametrize('value', [
+    '2016-13-45T25:61:00Z',  # every field out of range
+    '2016-00-10T00:00:00Z',
+    '2016-04-31T00:00:00Z',
+    '2015-02-29T00:00:00Z',  # not a leap year
+    '1900-02-29T00:00:00Z',
+    '2016-04-29T24:00:00Z',
+    '2016-04-29T10:60:00Z',
+    '2016-04-29T10:00:60Z',
+])
+def test_parse_timestamps_invalid_dates_raise(value):
+    with pytest.raises(ValueError):
+        parse_timestamps(['2016-04-29T00:00:00Z', value])
+
+
+def test_weekday_codes():
+    days = np.arange(-1000, 1000)
+    dates = pd.to_datetime(days, unit='D')
+    np.testing.assert_array_equal(weekday_codes(days), dates.weekday)
+
+
+def test_lead_time_codes():
+    waiting = np.array([-1, 0, 1, 7, 8, 30, 31, 90, 91, 179])
+    np.testing.assert_array_equal(lead_time_codes(waiting),
+                                  [-1, 0, 1, 1, 2, 2, 3, 3, 4, 4])
+
+
+def test_add_date_features_counts_calendar_days():
+    df = pd.DataFrame({
+        'Scheduled_Day': parse_timestamps([
+            '2016-04-29T18:38:08Z', '2016-04-29T00:00:00Z',
+            '2016-04-28T23:59:59Z', '2016-05-02T08:00:00Z']),
+        'Appointment_Day': parse_timestamps([
+            '2016-04-29T00:00:00Z', '2016-04-29T00:00:00Z',
+            '2016-04-29T00:00:00Z', '2016-04-29T00:00:00Z']),
+    })
+    add_date_features(df)
+    assert df['Waiting_Days'].tolist() == [0, 0, 1, -3]
+    assert df['Appointment_Weekday'].tolist() == ['Friday'] * 4
+    assert df['Scheduled_Hour'].tolist() == [18, 0, 23, 8]
+    assert df['Lead_Time'].tolist()[:3] == ['Same day', 'Same day',
+                                             '1-7 days']
+    assert pd.isna(df['Lead_Time'][3])
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noshow.cleaning import RULES
+from noshow.integrity import (HashStore, check_csv, check_integrity,
+                              duplicated, row_hashes)
+from noshow.loader import COLUMNS, load_appointments
+from noshow.synthetic import write_synthetic
+
+
+@pytest.fixture(scope='module')
+def export(tmp_path_factory):
+    path = tmp_path_factory.mktemp('integrity') / 'export.csv'
+    write_synthetic(str(path), 4000, seed=3)
+    return load_appointments(str(path))
+
+
+def _to_csv(df, path):
+    # Back to the export's headers and timestamp format
+    out = df.rename(columns={v: k for k, v in COLUMNS.items()})
+    for column in ('ScheduledDay', 'AppointmentDay'):
+        out[column] = out[column].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    out.to_csv(path, index=False)
+    return str(path)
+
+
+def _with_copies(df):
+    # Rows 3 and 2500 copied to the end; row 7's id reused with another Age
+    reused = df.iloc[[7]].copy()
+    reused['Age'] += 1
+    return pd.concat([df, df.iloc[[3, 2500]], reused], ignore_index=True)
+
+
+def test_duplicates_within_a_frame(export):
+    df = _with_copies(export)
+    report, violations = check_integrity(df)
+    n = len(export)
+    np.testing.assert_array_equal(violations['duplicate_rows'], [n, n + 1])
+    np.testing.assert_array_equal(violations['duplicate_appointment_id'],
+                                  [n, n + 1, n + 2])
+    assert report.loc['duplicate_rows', 'rows'] == df.duplicated().sum()
+
+
+def test_missing_value_is_not_a_duplicate(export):
+    df = export.iloc[[0, 0]].copy()
+    df.iloc[1, df.columns.get_loc('Gender')] = np.nan
+    assert not duplicated(row_hashes(df)).any()
+
+
+def test_range_checks_match_the_cleaning_rule(export):
+    df = export.copy()
+    df.loc[[5, 9], 'Age'] = -1
+    df.loc[11, 'Handcap'] = 3
+    _, violations = check_integrity(df)
+    rule = next(r for r in RULES if r.name == 'invalid_age')
+    np.testing.assert_array_equal(violations['invalid_age'],
+                                  np.flatnonzero(rule.match(df)))
+    np.testing.assert_array_equal(violations['handcap_range'],
+                                  np.flatnonzero(df['Handcap'] > 1))
+
+
+def test_duplicates_across_chunks(export, tmp_path):
+    df = _with_copies(export)
+    path = _to_csv(df, tmp_path / 'copies.csv')
+    whole, _ = check_integrity(load_appointments(path))
+    chunked = check_csv(path, chunksize=700)
+    pd.testing.assert_series_equal(chunked['rows'], whole['rows'])
+
+
+def test_duplicates_against_a_hash_store(export, tmp_path):
+    store = HashStore()
+    check_integrity(export.iloc[:3000], store)
+    assert len(store) == 3000
+    path = str(tmp_path / 'hashes.npz')
+    store.save(path)
+    store = HashStore.load(path)
+
+    # The next export repeats the last 500 checked rows
+    report, violations = check_integrity(export.iloc[2500:], store,
+                                         update=False)
+    np.testing.assert_array_equal(violations['duplicate_rows'],
+                                  np.arange(500))
+    assert report.loc['duplicate_appointment_id', 'rows'] == 500
+    assert len(store) == 3000
+
+    check_integrity(export.iloc[2500:], store)
+    assert len(store) == len(export)
+    assert len(HashStore.load(str(tmp_path / 'missing.npz'))) == 0
+
+
+def test_hash_store_of_another_version_is_refused(tmp_path):
+    path = str(tmp_path / 'old.npz')
+    np.savez(path, version=0, rows=np.zeros(0, dtype=np.uint64))
+    with pytest.raises(ValueError):
+        HashStore.load(path)
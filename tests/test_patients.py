@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from noshow.patients import HISTORY_COLUMNS, PatientIndex
+from noshow.scoring import with_history
+
+
+def _frame(rows):
+    """Appointments from (patient, scheduled, appointment day, no-show)."""
+    ids, scheduled, days, no_show = zip(*rows) if rows else ([], [], [], [])
+    return pd.DataFrame({
+        'Patient_Id': np.array(ids, dtype=np.int64),
+        'Scheduled_Day': pd.to_datetime(list(scheduled), utc=True),
+        'Appointment_Day': pd.to_datetime(list(days), utc=True),
+        'No_Show': pd.Categorical(list(no_show), categories=['No', 'Yes']),
+    })
+
+
+def _random_frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp('2016-04-01', tz='UTC') \
+        + pd.to_timedelta(rng.integers(0, 60, n), unit='D')
+    return pd.DataFrame({
+        'Patient_Id': rng.integers(0, 400, n),
+        'Scheduled_Day': days - pd.to_timedelta(rng.integers(0, 10 ** 6, n),
+                                                unit='s'),
+        'Appointment_Day': days,
+        'No_Show': pd.Categorical(np.where(rng.random(n) < 0.2, 'Yes', 'No'),
+                                  categories=['No', 'Yes']),
+    }, index=rng.permutation(n) + 1000)
+
+
+def _brute_force(df):
+    history = []
+    for pid, day in zip(df['Patient_Id'], df['Appointment_Day']):
+        past = df[(df['Patient_Id'] == pid) & (df['Appointment_Day'] < day)]
+        history.append((len(past), (past['No_Show'] == 'Yes').sum(),
+                        (day - past['Appointment_Day'].max()).days
+                        if len(past) else np.nan))
+    return pd.DataFrame(history, columns=HISTORY_COLUMNS, index=df.index)
+
+
+def test_same_day_appointments_are_not_history():
+    df = _frame([
+        (1, '2016-04-01 08:00', '2016-04-05', 'Yes'),
+        (1, '2016-04-02 09:00', '2016-04-08', 'No'),
+        (1, '2016-04-03 10:00', '2016-04-08', 'Yes'),
+        (2, '2016-04-03 10:00', '2016-04-08', 'No'),
+    ])
+    features = PatientIndex(df).features()
+    assert features['Prior_Visits'].tolist() == [0, 1, 1, 0]
+    assert features['Prior_No_Shows'].tolist() == [0, 1, 1, 0]
+    np.testing.assert_array_equal(features['Days_Since_Last_Visit'],
+                                  [np.nan, 3, 3, np.nan])
+
+
+def test_features_match_brute_force():
+    df = _random_frame(800)
+    features = PatientIndex(df).features()
+    expected = _brute_force(df)
+    for column in HISTORY_COLUMNS:
+        np.testing.assert_array_equal(features[column].to_numpy(float),
+                                      expected[column].to_numpy(float))
+
+
+def test_lookup_of_the_same_frame_equals_features():
+    df = _random_frame()
+    index = PatientIndex(df)
+    pd.testing.assert_frame_equal(index.lookup(df), index.features())
+
+
+def test_lookup_of_new_bookings_ignores_unknown_patients():
+    past = _random_frame(seed=1)
+    index = PatientIndex(past)
+    new = past.iloc[:50].drop(columns='No_Show').copy()
+    new['Appointment_Day'] += pd.Timedelta(days=100)
+    new.iloc[0, new.columns.get_loc('Patient_Id')] = 10 ** 9
+    history = index.lookup(new)
+    visits = past.groupby('Patient_Id').size()
+    assert history['Prior_Visits'].iloc[0] == 0
+    np.testing.assert_array_equal(
+        history['Prior_Visits'].iloc[1:],
+        visits.reindex(new['Patient_Id'].iloc[1:]).to_numpy())
+
+
+def test_empty_past_gives_no_history():
+    index = PatientIndex(_frame([]))
+    assert len(index) == 0 and len(index.features()) == 0
+    assert index.top_repeat().empty
+    batch = _random_frame(20).drop(columns='No_Show')
+    history = with_history(batch, index)
+    assert (history['Prior_Visits'] == 0).all()
+    assert history['Days_Since_Last_Visit'].isna().all()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noshow.cache import load_clean
+from noshow.outofcore import aggregate_csv, question_results, run_out_of_core
+from noshow.plan import plan_questions
+from noshow.questions import QUESTIONS
+from noshow.synthetic import write_synthetic
+
+
+@pytest.fixture(scope='module')
+def export(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('questions') / 'export.csv')
+    write_synthetic(path, 30000, seed=7)
+    return path
+
+
+@pytest.fixture(scope='module')
+def expected(export):
+    df = load_clean(export, None)
+    return {number: question.compute(df)
+            for number, question in QUESTIONS.items()}
+
+
+def assert_same(result, expected, path='result'):
+    """Same structure and values; floats up to rounding."""
+    if isinstance(expected, dict):
+        assert list(result) == list(expected), path
+        for key in expected:
+            assert_same(result[key], expected[key], '{}[{!r}]'.format(path,
+                                                                      key))
+    elif isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(result, expected, obj=path)
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(result, expected, obj=path)
+    elif isinstance(expected, tuple):
+        assert type(result) is type(expected), path
+        for field, a, b in zip(expected._fields, result, expected):
+            assert_same(a, b, '{}.{}'.format(path, field))
+    else:
+        np.testing.assert_allclose(result, expected, rtol=1e-9, err_msg=path)
+
+
+def _out_of_core(export, **params):
+    aggregator, _ = aggregate_csv(export, 7000)
+    return question_results(aggregator, **params)
+
+
+def test_out_of_core_matches_compute(export, expected):
+    results = run_out_of_core(export, chunksize=7000)
+    for number in QUESTIONS:
+        assert_same(results[number], expected[number], 'q{}'.format(number))
+
+
+def test_planned_questions_match_compute(export, expected):
+    df = load_clean(export, None)
+    results = plan_questions(df)
+    for number in QUESTIONS:
+        assert_same(results[number], expected[number], 'q{}'.format(number))
+    # One question at a time needs only its own columns
+    for number, question in QUESTIONS.items():
+        result = plan_questions(df[question.columns], [number])[number]
+        assert_same(result, expected[number], 'q{}'.format(number))
+
+
+def test_paths_take_the_same_parameters(export):
+    df = load_clean(export, None)
+    expected = QUESTIONS[6].compute(df, k=3)
+    assert_same(plan_questions(df, [6], k=3)[6], expected)
+    assert_same(_out_of_core(export, k=3)[6], expected)
+    expected = QUESTIONS[8].compute(df, method='quantile', n_bins=5)
+    assert_same(plan_questions(df, [8], method='quantile', n_bins=5)[8],
+                expected)
+    assert_same(_out_of_core(export, method='quantile',
+                                        n_bins=5)[8], expected)
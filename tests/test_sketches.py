@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noshow.sketches import (CountMinSketch, HyperLogLog, TDigest, TopK,
+                             hash64)
+
+
+@pytest.mark.parametrize('n', [10, 1000, 30000, 300000])
+def test_hyperloglog_count_within_error(n):
+    hll = HyperLogLog.from_error(0.01)
+    assert hll.error <= 0.01
+    values = np.arange(n, dtype=np.int64) * 7919
+    hll.update(values).update(values[:n // 2])  # repeats do not count
+    assert abs(hll.count() - n) <= max(1, 3 * hll.error * n)
+
+
+def test_hyperloglog_merge_equals_one_pass():
+    values = np.random.default_rng(0).integers(0, 10 ** 9, 50000)
+    whole = HyperLogLog(12).update(values)
+    merged = HyperLogLog(12).update(values[:20000]).merge(
+        HyperLogLog(12).update(values[20000:]))
+    np.testing.assert_array_equal(merged.registers, whole.registers)
+    assert merged.count() == whole.count()
+    with pytest.raises(ValueError):
+        whole.merge(HyperLogLog(10))
+
+
+def test_count_min_never_under_and_within_bound():
+    rng = np.random.default_rng(1)
+    values = rng.zipf(1.5, 100000) % 5000
+    sketch = CountMinSketch.from_error(epsilon=0.001, delta=0.01)
+    sketch.update(values)
+    keys, counts = np.unique(values, return_counts=True)
+    estimates = sketch.query(keys)
+    assert (estimates >= counts).all()
+    over = estimates - counts
+    assert np.mean(over <= 0.001 * sketch.total) >= 0.99
+    assert sketch.total == len(values)
+
+
+def test_count_min_merge_equals_one_pass():
+    values = np.random.default_rng(2).integers(0, 1000, 20000)
+    whole = CountMinSketch(500, 4).update(values)
+    merged = CountMinSketch(500, 4).update(values[:7000]).merge(
+        CountMinSketch(500, 4).update(values[7000:]))
+    np.testing.assert_array_equal(merged.table, whole.table)
+    assert merged.total == whole.total
+
+
+def test_top_k_finds_the_most_frequent_keys():
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.zipf(1.3, 200000) % 20000)
+    expected = values.value_counts().head(5)
+    chunks = [values.iloc[i:i + 50000] for i in range(0, len(values), 50000)]
+    single = TopK(5)
+    for chunk in chunks:
+        single.update(chunk)
+    merged = TopK(5).update(chunks[0]).update(chunks[1]).merge(
+        TopK(5).update(chunks[2]).update(chunks[3]))
+    for top in (single.top(), merged.top()):
+        assert list(top.index) == list(expected.index)
+        assert (top.to_numpy() >= expected.to_numpy()).all()
+
+
+def _rank_error(digest, values, qs):
+    sorted_values = np.sort(values)
+    estimates = digest.quantile(qs)
+    ranks = np.searchsorted(sorted_values, estimates) / len(values)
+    return np.abs(ranks - qs).max()
+
+
+def test_tdigest_quantiles_within_rank_error():
+    values = np.random.default_rng(4).lognormal(2, 1, 200000)
+    digest = TDigest(200)
+    for i in range(0, len(values), 25000):
+        digest.update(values[i:i + 25000])
+    qs = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+    assert _rank_error(digest, values, qs) < 0.005
+    assert digest.count == len(values)
+    assert digest.mean() == pytest.approx(values.mean(), rel=1e-9)
+    assert len(digest.means) <= 2 * digest.compression
+
+
+def test_tdigest_merge_matches_one_pass():
+    values = np.random.default_rng(5).normal(40, 20, 100000).round()
+    whole = TDigest().update(values)
+    merged = TDigest().update(values[:30000]).merge(
+        TDigest().update(values[30000:]))
+    assert merged.count == whole.count
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    assert merged.mean() == pytest.approx(whole.mean(), rel=1e-12)
+    qs = np.linspace(0.01, 0.99, 25)
+    np.testing.assert_allclose(merged.quantile(qs), whole.quantile(qs),
+                               atol=1.0)
+
+
+def test_tdigest_drops_missing_values_with_their_weights():
+    digest = TDigest().update([np.nan, 1, 2], [5, 1, 10])
+    np.testing.assert_array_equal(digest.means, [1, 2])
+    np.testing.assert_array_equal(digest.weights, [1, 10])
+    assert np.isnan(TDigest().update([np.nan]).quantile(0.5))
+
+
+def test_hash64_gives_missing_categories_their_own_hash():
+    values = pd.Series(['F', 'M', None, 'M'],
+                       dtype=pd.CategoricalDtype(['F', 'M']))
+    hashes = hash64(values)
+    assert len(set(hashes[:3])) == 3 and hashes[1] == hashes[3]
+    np.testing.assert_array_equal(
+        hash64(values[[0, 1, 3]]), hash64(pd.Series(['F', 'M', 'M'])
+                                          .astype(values.dtype)))
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats as scipy_stats
+
+from noshow.stats import (adjust_pvalues, as_counts, chi2_batch, chi2_test,
+                          class_moments, stack_tables, ttest_by_class)
+
+TABLES = [
+    [[88208, 22319], [10, 5]],
+    [[57246, 14594], [30962, 7725]],
+    [[1, 20, 300], [40, 5, 600], [7, 80, 9]],
+]
+
+
+@pytest.mark.parametrize('counts', TABLES)
+def test_chi2_test_matches_scipy(counts):
+    result = chi2_test(np.array(counts))
+    expected = scipy_stats.chi2_contingency(counts, correction=False)
+    assert result.chi2 == pytest.approx(expected[0], rel=1e-10)
+    assert result.p == pytest.approx(expected[1], rel=1e-8, abs=1e-300)
+    assert result.dof == expected[2]
+    np.testing.assert_allclose(result.expected, expected[3])
+
+
+def test_chi2_batch_matches_single_tables():
+    # Zero padding must not change the statistic or the degrees of freedom
+    result = chi2_batch(stack_tables([np.array(t) for t in TABLES]))
+    for i, counts in enumerate(TABLES):
+        single = chi2_test(np.array(counts))
+        assert result.chi2[i] == pytest.approx(single.chi2, rel=1e-12)
+        assert result.p[i] == pytest.approx(single.p, rel=1e-10, abs=1e-300)
+        assert result.dof[i] == single.dof
+
+
+def test_adjust_pvalues_benjamini_hochberg():
+    p = [0.01, 0.04, 0.03, 0.005, np.nan, 0.5]
+    # BH by hand: sorted p * m / rank, then the running minimum from the top
+    expected = [0.025, 0.05, 0.05, 0.025, np.nan, 0.5]
+    np.testing.assert_allclose(adjust_pvalues(p), expected)
+    if hasattr(scipy_stats, 'false_discovery_control'):
+        valid = [v for v in p if not np.isnan(v)]
+        np.testing.assert_allclose(
+            adjust_pvalues(valid), scipy_stats.false_discovery_control(valid))
+
+
+def test_adjust_pvalues_bonferroni():
+    np.testing.assert_allclose(
+        adjust_pvalues([0.01, 0.3, np.nan], 'bonferroni'), [0.02, 0.6, np.nan])
+    with pytest.raises(ValueError):
+        adjust_pvalues([0.1], 'holm')
+
+
+def test_chi2_rejects_proportion_tables():
+    df = pd.DataFrame({'Gender': ['F', 'F', 'M', 'M', 'M'],
+                       'No_Show': ['No', 'Yes', 'No', 'No', 'Yes']})
+    proportions = pd.crosstab(df['Gender'], df['No_Show'], normalize='index')
+    with pytest.raises(ValueError):
+        as_counts(proportions)
+    with pytest.raises(ValueError):
+        chi2_test(proportions)
+    with pytest.raises(ValueError):
+        chi2_test([[3, -1], [2, 4]])
+    # Whole-number floats are counts
+    assert as_counts(np.array([[3., 1.], [2., 4.]])).dtype == np.int64
+
+
+def _frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    no_show = rng.random(n) < 0.2
+    return pd.DataFrame({
+        'Age': np.where(no_show, rng.normal(34, 21, n),
+                        rng.normal(37, 23, n)).round(),
+        'No_Show': pd.Categorical(np.where(no_show, 'Yes', 'No'),
+                                  categories=['No', 'Yes']),
+    })
+
+
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_ttest_by_class_matches_scipy(equal_var):
+    df = _frame()
+    result = ttest_by_class(df, 'Age', equal_var=equal_var)
+    groups = [df.loc[df['No_Show'] == c, 'Age'] for c in ('No', 'Yes')]
+    expected = scipy_stats.ttest_ind(*groups, equal_var=equal_var)
+    assert result.statistic == pytest.approx(expected.statistic, rel=1e-9)
+    assert result.p == pytest.approx(expected.pvalue, rel=1e-7)
+    assert result.difference == pytest.approx(groups[0].mean()
+                                              - groups[1].mean())
+
+
+def test_class_moments_of_chunks_match_one_pass():
+    df = _frame()
+    whole = class_moments(df, 'Age')
+    chunked = class_moments((df.iloc[i:i + 700]
+                             for i in range(0, len(df), 700)), 'Age')
+    np.testing.assert_array_equal(chunked.n, whole.n)
+    np.testing.assert_allclose(chunked.mean, whole.mean, rtol=1e-12)
+    np.testing.assert_allclose(chunked.m2, whole.m2, rtol=1e-12)